@@ -0,0 +1,16 @@
+from extensions import db
+from app import app
+from models import ChatMessage
+from sqlalchemy import inspect
+
+with app.app_context():
+    # Create the ChatMessage indexes that db.create_all() does not add to an existing table
+    inspector = inspect(db.engine)
+    existing = {index['name'] for index in inspector.get_indexes(ChatMessage.__tablename__)}
+
+    for index in ChatMessage.__table__.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+            print(f"Created index {index.name} on {ChatMessage.__tablename__}")
+        else:
+            print(f"Index {index.name} already exists on {ChatMessage.__tablename__}")
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class AnswerCache:
+    """
+    Thread-safe LRU cache with a time-to-live, used for chatbot answers.
+
+    Keys carry the content version they were computed from, so an edit never
+    serves a stale answer: old entries are simply never looked up again and
+    age out of the LRU order. The TTL bounds how long an entry can live even
+    when nothing in its key changes. Hits, misses and evictions are counted
+    for monitoring.
+    """
+
+    def __init__(self, maxsize=2048, ttl=300.0):
+        """
+        Args:
+            maxsize (int): Maximum number of entries; 0 disables the cache.
+            ttl (float): Seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired."""
+        if not self.maxsize:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries beyond maxsize."""
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Counters and size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
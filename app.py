@@ -2,9 +2,10 @@ import os
 import logging
 import re
 import json
+import time
 from datetime import datetime, timedelta
 from flask import (
-    Flask, render_template, request, jsonify, session, redirect, url_for, flash
+    Flask, render_template, request, jsonify, session, redirect, url_for, flash, Response
 )
 from flask_login import (
     LoginManager, login_user, logout_user, login_required, current_user
@@ -17,10 +18,16 @@ logging.basicConfig(level=logging.INFO)
 
 # Import custom modules
 from chatbot import Chatbot
-from user_management import UserManager
+from chat_retention import ChatRetention
+from user_management import UserManager, DEFAULT_SESSIONS_PAGE, DEFAULT_MESSAGES_PAGE, MAX_PAGE_SIZE
 from models import Admin, User as UserModel
 from extensions import db
 from database import email_directory
+from database import persistence
+from database import content_store
+from response_cache import cached_json_response, document_generation, file_generation, json_cache
+from metrics import MetricFamily, registry as metrics_registry
+from database.user_database import rule_utils
 
 app = Flask(__name__)
 app.template_folder = 'htdocs'
@@ -35,6 +42,22 @@ app.config['SQLALCHEMY_ECHO'] = True  # Log SQL statements for debugging
 app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'static', 'uploads', 'locations')
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
 
+# Browser cache lifetime (seconds) of the /database/*.json endpoints; 0 = always revalidate via ETag
+app.config['DATA_JSON_MAX_AGE'] = int(os.environ.get('DATA_JSON_MAX_AGE', '0'))
+
+# Chat history retention, off unless configured: days to keep a session after its last message,
+# per role (0 = forever). Expired sessions are moved to monthly gzip archives in CHAT_ARCHIVE_DIR
+# and deleted from the database every CHAT_RETENTION_INTERVAL seconds (0 = no background job).
+# To enable it, set e.g. CHAT_RETENTION_DAYS_USER=365 CHAT_RETENTION_DAYS_ADMIN=90
+# CHAT_RETENTION_INTERVAL=21600, or leave the interval at 0 and run archive_chat_history.py from cron.
+# Run backfill_chat_sessions.py once before enabling it on a database with chat history from older versions.
+app.config['CHAT_RETENTION_DAYS'] = {
+    'user': int(os.environ.get('CHAT_RETENTION_DAYS_USER', '0')),
+    'admin': int(os.environ.get('CHAT_RETENTION_DAYS_ADMIN', '0')),
+}
+app.config['CHAT_RETENTION_INTERVAL'] = int(os.environ.get('CHAT_RETENTION_INTERVAL', '0'))
+app.config['CHAT_ARCHIVE_DIR'] = os.environ.get('CHAT_ARCHIVE_DIR', os.path.join(app.instance_path, 'chat_archive'))
+
 def allowed_file(filename):
     """
     Check if the uploaded file has an allowed extension.
@@ -53,7 +76,7 @@ with app.app_context():
     try:
         db.create_all()
         app.logger.info("Database tables created successfully")
-        user_manager = UserManager(db)
+        user_manager = UserManager(db, app=app)
 
         # Create default admin user if not exists
         if not Admin.query.filter_by(email='admin@wvsu.edu.ph').first():
@@ -67,7 +90,24 @@ with app.app_context():
         app.logger.error(f"Database initialization failed: {str(e)}. App will run without database features.")
         user_manager = None
 
-chatbot = Chatbot()  # Rules are now loaded from soict.py automatically
+chat_retention = ChatRetention(
+    app, db, app.config['CHAT_ARCHIVE_DIR'], app.config['CHAT_RETENTION_DAYS'],
+    interval=app.config['CHAT_RETENTION_INTERVAL'])
+
+@app.before_request
+def start_chat_retention():
+    # Started from the first request so it runs in each worker, not in a preloading master
+    if user_manager is not None:
+        chat_retention.start()
+
+# Rules are now loaded from soict.py automatically. Each worker checks the data
+# files for edits made by other workers at most every CONTENT_RELOAD_INTERVAL seconds.
+# Answers to repeated questions are cached (RESPONSE_CACHE_SIZE entries, 0 = off) for RESPONSE_CACHE_TTL seconds.
+chatbot = Chatbot(
+    reload_interval=float(os.environ.get('CONTENT_RELOAD_INTERVAL', '1.0')),
+    cache_size=int(os.environ.get('RESPONSE_CACHE_SIZE', '2048')),
+    cache_ttl=float(os.environ.get('RESPONSE_CACHE_TTL', '300')),
+)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -112,8 +152,10 @@ def get_categories_json():
     import os
     categories_path = os.path.join(app.root_path, 'database', 'categories.json')
     try:
-        with open(categories_path, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
+        return cached_json_response(
+            'categories', file_generation(categories_path),
+            lambda: persistence.read_json(categories_path, default=[]),
+            max_age=app.config['DATA_JSON_MAX_AGE'])
     except Exception as e:
         app.logger.error(f"Failed to load categories.json: {e}")
         return jsonify([])
@@ -126,8 +168,9 @@ def get_faqs_json():
     import os
     faqs_path = os.path.join(app.root_path, 'database', 'faqs.json')
     try:
-        with open(faqs_path, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
+        document = content_store.get_document(faqs_path, [], kind='faqs')
+        return cached_json_response('faqs', document_generation(document), document.snapshot,
+                                    max_age=app.config['DATA_JSON_MAX_AGE'])
     except Exception as e:
         app.logger.error(f"Failed to load faqs.json: {e}")
         return jsonify([])
@@ -140,13 +183,15 @@ def get_locations_json():
     import os
     locations_path = os.path.join(app.root_path, 'database', 'locations', 'locations.json')
     try:
-        with open(locations_path, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
+        document = content_store.get_document(locations_path, [], kind='locations')
+        return cached_json_response('locations', document_generation(document), document.snapshot,
+                                    max_age=app.config['DATA_JSON_MAX_AGE'])
     except Exception as e:
         app.logger.error(f"Failed to load locations.json: {e}")
         return jsonify([])
 
 @app.route('/database/guest_rules.json')
+@app.route('/database/guest_database/all_guest_rules.json')
 def get_guest_rules_json():
     """
     Serve all_guest_rules.json file.
@@ -154,13 +199,15 @@ def get_guest_rules_json():
     import os
     rules_path = os.path.join(app.root_path, 'database', 'guest_database', 'all_guest_rules.json')
     try:
-        with open(rules_path, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
+        store = rule_utils.get_store(rules_path)
+        return cached_json_response('guest_rules', document_generation(store.document), store.snapshot,
+                                    max_age=app.config['DATA_JSON_MAX_AGE'])
     except Exception as e:
         app.logger.error(f"Failed to load guest_rules.json: {e}")
         return jsonify({})
 
 @app.route('/database/user_rules.json')
+@app.route('/database/user_database/all_user_rules.json')
 def get_user_rules_json():
     """
     Serve all_user_rules.json file.
@@ -168,8 +215,9 @@ def get_user_rules_json():
     import os
     rules_path = os.path.join(app.root_path, 'database', 'user_database', 'all_user_rules.json')
     try:
-        with open(rules_path, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
+        store = rule_utils.get_store(rules_path)
+        return cached_json_response('user_rules', document_generation(store.document), store.snapshot,
+                                    max_age=app.config['DATA_JSON_MAX_AGE'])
     except Exception as e:
         app.logger.error(f"Failed to load user_rules.json: {e}")
         return jsonify({})
@@ -182,12 +230,45 @@ def get_preprocessed_guest_rules_json():
     import os
     rules_path = os.path.join(app.root_path, 'database', 'preprocessed_guest_rules.json')
     try:
-        with open(rules_path, 'r', encoding='utf-8') as f:
-            return jsonify(json.load(f))
+        return cached_json_response(
+            'preprocessed_guest_rules', file_generation(rules_path),
+            lambda: persistence.read_json(rules_path, default={}),
+            max_age=app.config['DATA_JSON_MAX_AGE'])
     except Exception as e:
         app.logger.error(f"Failed to load preprocessed_guest_rules.json: {e}")
         return jsonify({})
 
+@app.route('/question_catalog')
+def get_question_catalog():
+    """
+    Serve the question catalog for the current user's role (question ids, text and preprocessed text only).
+    Built once per content version and role.
+    """
+    user_role = session.get('user_type', None)
+    role = user_role if user_role in chatbot.snapshots else 'user'
+    try:
+        chatbot.refresh_if_changed()
+        return cached_json_response(f'question_catalog:{role}', chatbot.content_version,
+                                    lambda: chatbot.question_catalog(role),
+                                    max_age=app.config['DATA_JSON_MAX_AGE'])
+    except Exception as e:
+        app.logger.error(f"Failed to build question catalog: {e}")
+        return jsonify({'categories': {}})
+
+@app.route('/suggest')
+def suggest():
+    """
+    Return type-ahead completions for the chat input: ?q=<typed text>&k=<max results, default 8>.
+    """
+    prefix = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('k', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    chatbot.refresh_if_changed()
+    suggestions = chatbot.suggest(prefix, user_role=session.get('user_type', None), limit=limit)
+    return jsonify({'suggestions': suggestions})
+
 @app.route('/welcome')
 def welcome_api():
     """
@@ -326,7 +407,7 @@ def logout():
 @app.route('/chat')
 def chat():
     """
-    Render the chat page with user info and chat history.
+    Render the chat page with user info and the email directory.
     """
     from database import email_directory
 
@@ -355,52 +436,37 @@ def chat():
     else:
         return redirect(url_for('welcome'))
 
-    session_date = request.args.get('session_date')
-    chat_history = None
-    chat_sessions_summary = None
-
-    if current_user.is_authenticated and role == 'user':
-        chat_sessions_summary = user_manager.get_chat_sessions_summary(current_user.id)
-        if session_date:
-            try:
-                selected_date = datetime.strptime(session_date, "%Y-%m-%d").date()
-            except ValueError:
-                selected_date = None
-
-            if selected_date:
-                full_history = user_manager.get_chat_history(current_user.id)
-                if selected_date in full_history:
-                    chat_history = full_history[selected_date]
-        else:
-            chat_history = None
-
+    # Chat history and the session list are loaded by the page from the paginated endpoints
     emails = email_directory.get_all_emails()
 
-    return render_template(
-        'chat.html', username=username, role=role,
-        chat_history=chat_history, chat_sessions_summary=chat_sessions_summary,
-        emails=emails
-    )
+    return render_template('chat.html', username=username, role=role, emails=emails)
+
+SEND_MESSAGE_SECONDS = metrics_registry.histogram(
+    'doran_send_message_seconds', 'Time spent handling /send_message, from parsing the request to building the reply.')
 
 @app.route('/send_message', methods=['POST'])
 def send_message():
     """
     Handle sending a message from the user and return chatbot response.
     """
+    start = time.perf_counter()
     data = request.get_json()
     user_message = data.get('message', '')
     session_id = data.get('session_id', '')
     user_role = session.get('user_type', None)
-    bot_response = chatbot.get_response(user_message, user_role=user_role)
+    # Fallback rotation state lives in the user's session, not on the shared chatbot
+    bot_response = chatbot.get_response(user_message, user_role=user_role, conversation=session)
 
     if current_user.is_authenticated and session_id:
-        user_manager.add_chat_message(current_user.id, session_id, 'user', user_message)
-        user_manager.add_chat_message(current_user.id, session_id, 'bot', bot_response)
+        user_manager.add_chat_message(current_user.id, session_id, 'user', user_message, user_role=user_role)
+        user_manager.add_chat_message(current_user.id, session_id, 'bot', bot_response, user_role=user_role)
 
-    return jsonify({
+    response = jsonify({
         'response': bot_response,
         'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     })
+    SEND_MESSAGE_SECONDS.observe(time.perf_counter() - start)
+    return response
 
 @app.route('/clear_history', methods=['POST'])
 @login_required
@@ -411,13 +477,26 @@ def clear_history():
     user_manager.clear_chat_history(current_user.id)
     return jsonify({'status': 'success'})
 
+def page_size(default):
+    """
+    Page size requested with ?limit=, clamped to 1..MAX_PAGE_SIZE.
+    """
+    try:
+        return min(max(int(request.args.get('limit', default)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return default
+
 @app.route('/get_chat_history')
 @login_required
 def get_chat_history():
     """
-    Get chat history for the current user.
+    Get one page of chat history for the current user: ?limit=<sessions per page>&cursor=<next_cursor>.
     """
-    history = user_manager.get_chat_history(current_user.id)
+    try:
+        history = user_manager.get_chat_history_page(
+            current_user.id, limit=page_size(DEFAULT_SESSIONS_PAGE), cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     return jsonify(history)
 
 @app.route('/get_chat_sessions_summary')
@@ -429,13 +508,30 @@ def get_chat_sessions_summary():
     sessions = user_manager.get_chat_sessions_summary(current_user.id)
     return jsonify(sessions)
 
+@app.route('/get_chat_sessions')
+@login_required
+def get_chat_sessions():
+    """
+    Get one page of chat sessions for the sidebar, newest first: ?limit=<page size>&cursor=<next_cursor>.
+    """
+    try:
+        sessions = user_manager.get_chat_sessions_page(
+            current_user.id, limit=page_size(DEFAULT_SESSIONS_PAGE), cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify(sessions)
+
 @app.route('/get_chat_session_history/<session_id>')
 @login_required
 def get_chat_session_history(session_id):
     """
-    Get full chat history for a specific session.
+    Get the newest messages of a specific session: ?limit=<page size>&cursor=<next_cursor> loads older ones.
     """
-    history = user_manager.get_chat_session_history(current_user.id, session_id)
+    try:
+        history = user_manager.get_chat_session_history(
+            current_user.id, session_id, limit=page_size(DEFAULT_MESSAGES_PAGE), cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     return jsonify(history)
 
 @app.route('/delete_chat_session/<session_id>', methods=['DELETE'])
@@ -577,6 +673,83 @@ def admin_rules():
                          categorized_user_rules=categorized_user_rules,
                          categorized_guest_rules=categorized_guest_rules)
 
+# Largest number of messages accepted by one /admin/batch_responses request
+MAX_BATCH_QUERIES = 20000
+
+@app.route('/admin/batch_responses', methods=['POST'])
+@login_required
+def admin_batch_responses():
+    """
+    Answer a batch of messages without recording them, for evaluation and cache preloading.
+    Body: {"queries": [...], "role": "user", "warm_cache": false}
+    """
+    if not is_admin(current_user):
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        return jsonify({'status': 'error', 'message': 'queries must be a list of strings'}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_BATCH_QUERIES} queries per request'}), 400
+
+    results = chatbot.get_responses(queries, user_role=data.get('role', 'user'), warm_cache=bool(data.get('warm_cache')))
+    stages = {}
+    for result in results:
+        stages[result.stage] = stages.get(result.stage, 0) + 1
+    return jsonify({
+        'status': 'success',
+        'stages': stages,
+        'results': [dict(query=query, **result.as_dict()) for query, result in zip(queries, results)]
+    })
+
+def collect_metrics():
+    """Cache counters, rule corpus sizes and the chat writer backlog of this worker, read at scrape time."""
+    stats = chatbot.answer_cache.stats()
+    yield MetricFamily('doran_answer_cache_lookups_total', 'counter', 'Answer cache lookups by result.',
+                       [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])])
+    yield MetricFamily('doran_answer_cache_evictions_total', 'counter', 'Answers evicted from the full answer cache.',
+                       [({}, stats['evictions'])])
+    yield MetricFamily('doran_answer_cache_entries', 'gauge', 'Answers currently cached.', [({}, stats['size'])])
+    yield MetricFamily('doran_answer_cache_hit_ratio', 'gauge', 'Share of answer cache lookups that hit.',
+                       [({}, stats['hit_ratio'])])
+
+    json_lookups = json_cache.hits + json_cache.misses
+    yield MetricFamily('doran_json_cache_lookups_total', 'counter', 'JSON endpoint cache lookups by result.',
+                       [({'result': 'hit'}, json_cache.hits), ({'result': 'miss'}, json_cache.misses)])
+    yield MetricFamily('doran_json_cache_entries', 'gauge', 'JSON endpoint bodies currently cached.',
+                       [({}, len(json_cache))])
+    yield MetricFamily('doran_json_cache_hit_ratio', 'gauge', 'Share of JSON endpoint cache lookups that hit.',
+                       [({}, json_cache.hits / json_lookups if json_lookups else 0.0)])
+
+    snapshots = chatbot.snapshots
+    corpus = []
+    for role, snapshot in sorted(snapshots.items()):
+        corpus.append(({'role': role, 'kind': 'question_rules'}, len(snapshot.question_index)))
+        corpus.append(({'role': role, 'kind': 'keyword_rules'}, len(snapshot.keyword_index)))
+        corpus.append(({'role': role, 'kind': 'faqs'}, len(snapshot.faqs)))
+        corpus.append(({'role': role, 'kind': 'suggestions'}, len(snapshot.suggest_index)))
+    yield MetricFamily('doran_rule_corpus_size', 'gauge', 'Entries in the compiled matching snapshot of each role.', corpus)
+    yield MetricFamily('doran_content_version', 'gauge', 'Generation of the compiled chatbot content.',
+                       [({}, snapshots['user'].version)])
+
+    if user_manager is not None and user_manager.chat_writer is not None:
+        yield MetricFamily('doran_chat_message_queue_depth', 'gauge', 'Chat messages waiting for the background writer.',
+                           [({}, user_manager.chat_writer.queue.qsize())])
+
+metrics_registry.register_collector(collect_metrics)
+
+@app.route('/metrics')
+def metrics():
+    """
+    Latency histograms and cache/corpus gauges of this worker in the Prometheus text format.
+    When METRICS_TOKEN is set, scrapes must send it as a bearer token.
+    """
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/admin/accounts')
 @login_required
 def admin_accounts():
@@ -633,8 +806,7 @@ def admin_faqs():
     import os
     faqs_path = os.path.join(app.root_path, 'database', 'faqs.json')
     try:
-        with open(faqs_path, 'r', encoding='utf-8') as f:
-            faqs_list = json.load(f)
+        faqs_list = content_store.get_document(faqs_path, [], kind='faqs').snapshot()
     except Exception as e:
         faqs_list = []
         app.logger.error(f"Failed to load faqs.json: {e}")
@@ -660,16 +832,7 @@ def add_info():
     import os
     faqs_path = os.path.join(app.root_path, 'database', 'faqs.json')
     try:
-        with open(faqs_path, 'r', encoding='utf-8') as f:
-            faqs_list = json.load(f)
-    except Exception:
-        faqs_list = []
-
-    faqs_list.append({'question': question, 'answer': answer})
-
-    try:
-        with open(faqs_path, 'w', encoding='utf-8') as f:
-            json.dump(faqs_list, f, indent=4)
+        content_store.get_document(faqs_path, [], kind='faqs').apply({'op': 'append', 'path': [], 'value': {'question': question, 'answer': answer}})
         # Reload FAQs in chatbot memory
         chatbot.reload_faqs()
     except Exception as e:
@@ -696,21 +859,19 @@ def edit_info():
 
     import os
     faqs_path = os.path.join(app.root_path, 'database', 'faqs.json')
+    faqs_document = content_store.get_document(faqs_path, [], kind='faqs')
     try:
-        with open(faqs_path, 'r', encoding='utf-8') as f:
-            faqs_list = json.load(f)
+        faqs_count = len(faqs_document.view())
     except Exception:
-        faqs_list = []
+        faqs_count = 0
 
-    if info_id < 0 or info_id >= len(faqs_list):
+    if info_id < 0 or info_id >= faqs_count:
         return jsonify({'status': 'error', 'message': 'Invalid FAQ ID'})
 
-    faqs_list[info_id]['question'] = question
-    faqs_list[info_id]['answer'] = answer
-
     try:
-        with open(faqs_path, 'w', encoding='utf-8') as f:
-            json.dump(faqs_list, f, indent=4)
+        faqs_document.apply({'op': 'update', 'path': [info_id], 'value': {'question': question, 'answer': answer}})
+        # Reload FAQs in chatbot memory
+        chatbot.reload_faqs()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save FAQs: {str(e)}'})
 
@@ -733,20 +894,19 @@ def delete_info():
 
     import os
     faqs_path = os.path.join(app.root_path, 'database', 'faqs.json')
+    faqs_document = content_store.get_document(faqs_path, [], kind='faqs')
     try:
-        with open(faqs_path, 'r', encoding='utf-8') as f:
-            faqs_list = json.load(f)
+        faqs_count = len(faqs_document.view())
     except Exception:
-        faqs_list = []
+        faqs_count = 0
 
-    if info_id < 0 or info_id >= len(faqs_list):
+    if info_id < 0 or info_id >= faqs_count:
         return jsonify({'status': 'error', 'message': 'Invalid FAQ ID'})
 
-    faqs_list.pop(info_id)
-
     try:
-        with open(faqs_path, 'w', encoding='utf-8') as f:
-            json.dump(faqs_list, f, indent=4)
+        faqs_document.apply({'op': 'delete', 'path': [info_id]})
+        # Reload FAQs in chatbot memory
+        chatbot.reload_faqs()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save FAQs: {str(e)}'})
 
@@ -768,8 +928,7 @@ def admin_locations():
     # Load locations from database/locations/locations.json
     locations_path = os.path.join(app.root_path, 'database', 'locations', 'locations.json')
     try:
-        with open(locations_path, 'r', encoding='utf-8') as f:
-            locations = json.load(f)
+        locations = content_store.get_document(locations_path, [], kind='locations').snapshot()
     except Exception as e:
         locations = []
         app.logger.error(f"Failed to load locations.json: {e}")
@@ -792,8 +951,7 @@ def admin_visuals():
     # Load visuals from database/visuals/visuals.json
     visuals_path = os.path.join(app.root_path, 'database', 'visuals', 'visuals.json')
     try:
-        with open(visuals_path, 'r', encoding='utf-8') as f:
-            visuals = json.load(f)
+        visuals = content_store.get_document(visuals_path, [], kind='visuals').snapshot()
     except Exception as e:
         visuals = []
         app.logger.error(f"Failed to load visuals.json: {e}")
@@ -850,12 +1008,6 @@ def add_location():
 
     # Load existing locations
     locations_path = os.path.join(app.root_path, 'database', 'locations', 'locations.json')
-    try:
-        with open(locations_path, 'r', encoding='utf-8') as f:
-            locations = json.load(f)
-    except:
-        locations = []
-
     # Create new location
     new_location = {
         'id': str(uuid.uuid4()),
@@ -866,12 +1018,11 @@ def add_location():
         'url': image_urls[0]  # Primary image
     }
 
-    locations.append(new_location)
-
-    # Save updated locations
+    # Append the new location
     try:
-        with open(locations_path, 'w', encoding='utf-8') as f:
-            json.dump(locations, f, indent=4)
+        content_store.get_document(locations_path, [], kind='locations').apply({'op': 'append', 'path': [], 'value': new_location})
+        # Reload location rules in chatbot memory
+        chatbot.reload_location_rules()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save location: {str(e)}'})
 
@@ -913,9 +1064,9 @@ def edit_location_with_id(location_id):
 
     # Load existing locations
     locations_path = os.path.join(app.root_path, 'database', 'locations', 'locations.json')
+    locations_document = content_store.get_document(locations_path, [], kind='locations')
     try:
-        with open(locations_path, 'r', encoding='utf-8') as f:
-            locations = json.load(f)
+        locations = locations_document.snapshot()
     except:
         locations = []
 
@@ -964,10 +1115,11 @@ def edit_location_with_id(location_id):
     if not location_to_edit.get('url') and location_to_edit['urls']:
         location_to_edit['url'] = location_to_edit['urls'][0]
 
-    # Save updated locations
+    # Save the edited location
     try:
-        with open(locations_path, 'w', encoding='utf-8') as f:
-            json.dump(locations, f, indent=4)
+        locations_document.apply({'op': 'replace_id', 'path': [], 'id': str(location_id), 'value': location_to_edit})
+        # Reload location rules in chatbot memory
+        chatbot.reload_location_rules()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save location: {str(e)}'})
 
@@ -994,21 +1146,20 @@ def delete_location():
 
     locations_path = os.path.join(app.root_path, 'database', 'locations', 'locations.json')
 
+    locations_document = content_store.get_document(locations_path, [], kind='locations')
     try:
-        with open(locations_path, 'r', encoding='utf-8') as f:
-            locations = json.load(f)
+        with locations_document.lock:
+            found = any(str(loc.get('id')) == str(location_id) for loc in locations_document.view())
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to load locations: {e}'})
 
-    # Filter out the location to delete
-    new_locations = [loc for loc in locations if str(loc.get('id')) != str(location_id)]
-
-    if len(new_locations) == len(locations):
+    if not found:
         return jsonify({'status': 'error', 'message': 'Location not found'})
 
     try:
-        with open(locations_path, 'w', encoding='utf-8') as f:
-            json.dump(new_locations, f, indent=4)
+        locations_document.apply({'op': 'delete_id', 'path': [], 'id': str(location_id)})
+        # Reload location rules in chatbot memory
+        chatbot.reload_location_rules()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save locations: {str(e)}'})
 
@@ -1067,12 +1218,6 @@ def add_visual():
 
     # Load existing visuals
     visuals_path = os.path.join(app.root_path, 'database', 'visuals', 'visuals.json')
-    try:
-        with open(visuals_path, 'r', encoding='utf-8') as f:
-            visuals = json.load(f)
-    except:
-        visuals = []
-
     # Create new visual
     new_visual = {
         'id': str(uuid.uuid4()),
@@ -1083,12 +1228,11 @@ def add_visual():
         'url': media_urls[0]  # Primary media
     }
 
-    visuals.append(new_visual)
-
-    # Save updated visuals
+    # Append the new visual
     try:
-        with open(visuals_path, 'w', encoding='utf-8') as f:
-            json.dump(visuals, f, indent=4)
+        content_store.get_document(visuals_path, [], kind='visuals').apply({'op': 'append', 'path': [], 'value': new_visual})
+        # Reload visual rules in chatbot memory
+        chatbot.reload_visual_rules()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save visual: {str(e)}'})
 
@@ -1129,9 +1273,9 @@ def edit_visual_with_id(visual_id):
 
     # Load existing visuals
     visuals_path = os.path.join(app.root_path, 'database', 'visuals', 'visuals.json')
+    visuals_document = content_store.get_document(visuals_path, [], kind='visuals')
     try:
-        with open(visuals_path, 'r', encoding='utf-8') as f:
-            visuals = json.load(f)
+        visuals = visuals_document.snapshot()
     except:
         visuals = []
 
@@ -1180,10 +1324,11 @@ def edit_visual_with_id(visual_id):
     if not visual_to_edit.get('url') and visual_to_edit['urls']:
         visual_to_edit['url'] = visual_to_edit['urls'][0]
 
-    # Save updated visuals
+    # Save the edited visual
     try:
-        with open(visuals_path, 'w', encoding='utf-8') as f:
-            json.dump(visuals, f, indent=4)
+        visuals_document.apply({'op': 'replace_id', 'path': [], 'id': str(visual_id), 'value': visual_to_edit})
+        # Reload visual rules in chatbot memory
+        chatbot.reload_visual_rules()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save visual: {str(e)}'})
 
@@ -1209,21 +1354,20 @@ def delete_visual():
 
     visuals_path = os.path.join(app.root_path, 'database', 'visuals', 'visuals.json')
 
+    visuals_document = content_store.get_document(visuals_path, [], kind='visuals')
     try:
-        with open(visuals_path, 'r', encoding='utf-8') as f:
-            visuals = json.load(f)
+        with visuals_document.lock:
+            found = any(str(vis.get('id')) == str(visual_id) for vis in visuals_document.view())
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to load visuals: {e}'})
 
-    # Filter out the visual to delete
-    new_visuals = [vis for vis in visuals if str(vis.get('id')) != str(visual_id)]
-
-    if len(new_visuals) == len(visuals):
+    if not found:
         return jsonify({'status': 'error', 'message': 'Visual not found'})
 
     try:
-        with open(visuals_path, 'w', encoding='utf-8') as f:
-            json.dump(new_visuals, f, indent=4)
+        visuals_document.apply({'op': 'delete_id', 'path': [], 'id': str(visual_id)})
+        # Reload visual rules in chatbot memory
+        chatbot.reload_visual_rules()
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Failed to save visuals: {str(e)}'})
 
@@ -1264,9 +1408,8 @@ def add_rule():
         return jsonify({'status': 'error', 'message': 'Question and response are required'})
 
     try:
+        # Chatbot.add_rule already refreshes the in-memory rules
         added_id = chatbot.add_rule(question, response, user_type=user_type, category=category)
-        # Reload rules to reflect changes in running app
-        chatbot.reload_rules()
         return jsonify({'status': 'success', 'id': added_id})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
@@ -1290,10 +1433,9 @@ def edit_rule():
         return jsonify({'status': 'error', 'message': 'Rule ID, question, and response are required'})
 
     try:
+        # Chatbot.edit_rule already updates the in-memory rules
         edited = chatbot.edit_rule(rule_id, question, response, user_type=user_type)
         if edited:
-            # Reload rules to reflect changes in running app
-            chatbot.reload_rules()
             return jsonify({'status': 'success'})
         else:
             return jsonify({'status': 'error', 'message': 'Rule not found'})
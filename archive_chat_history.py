@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Archive and delete chat sessions older than their role's retention period
+(CHAT_RETENTION_DAYS_USER / CHAT_RETENTION_DAYS_ADMIN), the same job the app
+runs in the background every CHAT_RETENTION_INTERVAL seconds.
+
+Usage:
+    python archive_chat_history.py [--max-batches N]
+
+Retention is off by default: set CHAT_RETENTION_DAYS_USER and/or
+CHAT_RETENTION_DAYS_ADMIN to enable it, otherwise this script archives nothing.
+
+Archives are written to CHAT_ARCHIVE_DIR (default instance/chat_archive),
+one chat-YYYY-MM.jsonl.gz file per month.
+"""
+
+import sys
+
+from app import app, chat_retention
+
+def archive_chat_history(max_batches=None):
+    """Run the retention job once and report what it archived."""
+    if not any(chat_retention.retention_days.values()):
+        print("Chat retention is disabled: set CHAT_RETENTION_DAYS_USER and/or CHAT_RETENTION_DAYS_ADMIN")
+        return
+    with app.app_context():
+        totals = chat_retention.run(max_batches=max_batches)
+    print(f"Archived {totals['sessions']} sessions ({totals['messages']} messages) to {chat_retention.archive_dir}")
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    max_batches = int(args[args.index('--max-batches') + 1]) if '--max-batches' in args else None
+    archive_chat_history(max_batches=max_batches)
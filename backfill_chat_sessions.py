@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Build chat_sessions rows for chat messages written before the table existed.
+
+The app backfills a user's sessions by itself the first time their sidebar
+is loaded, so this script is optional for the chat page. Run it once after
+upgrading to backfill every user at once, which chat retention needs: it
+only archives sessions that have a chat_sessions row.
+
+Usage:
+    python backfill_chat_sessions.py
+"""
+
+from extensions import db
+from app import app
+from models import ChatSession
+from sqlalchemy import inspect, text
+from user_management import backfill_chat_sessions
+
+# Sessions written per commit
+BATCH_SIZE = 500
+
+with app.app_context():
+    ChatSession.__table__.create(db.engine, checkfirst=True)
+    columns = [col['name'] for col in inspect(db.engine).get_columns(ChatSession.__tablename__)]
+    if 'user_role' not in columns:
+        # Tables created before retention by role; existing sessions count as user sessions
+        db.session.execute(text("ALTER TABLE chat_sessions ADD COLUMN user_role VARCHAR(10) NOT NULL DEFAULT 'user'"))
+        db.session.commit()
+        print("Added user_role column to chat_sessions table")
+
+    created = backfill_chat_sessions(db, batch_size=BATCH_SIZE)
+    print(f"Created or repaired {created} chat_sessions rows")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Run a file of messages through the chatbot's matcher and write the results.
+
+Usage:
+    python batch_responses.py QUERIES_FILE [--role guest|user|admin] [--output results.jsonl]
+
+QUERIES_FILE has one message per line. Each output line is a JSON object with
+the message, the matching stage, the matched rule id and category, the score
+and the response. A per-stage summary is printed at the end. Nothing is
+recorded in any chat history.
+"""
+
+import json
+import sys
+
+from app import app, chatbot
+
+def run_batch(queries_path, role='user', output_path=None):
+    """Answer every line of queries_path as role and write the results as JSON lines."""
+    with open(queries_path, encoding='utf-8') as f:
+        queries = [line.rstrip('\n') for line in f]
+    # The email directory lookup needs the database
+    with app.app_context():
+        results = chatbot.get_responses(queries, user_role=role)
+
+    out = open(output_path, 'w', encoding='utf-8') if output_path else sys.stdout
+    try:
+        for query, result in zip(queries, results):
+            out.write(json.dumps(dict(query=query, **result.as_dict()), ensure_ascii=False) + '\n')
+    finally:
+        if output_path:
+            out.close()
+
+    stages = {}
+    for result in results:
+        stages[result.stage] = stages.get(result.stage, 0) + 1
+    summary = ", ".join(f"{stage}: {count}" for stage, count in sorted(stages.items()))
+    print(f"{len(results)} queries ({summary})", file=sys.stderr)
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    role = args[args.index('--role') + 1] if '--role' in args else 'user'
+    output_path = args[args.index('--output') + 1] if '--output' in args else None
+    run_batch(args[0], role=role, output_path=output_path)
@@ -0,0 +1,241 @@
+import contextlib
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+from database.persistence import dumps_compact
+from worker_thread import WorkerThread
+
+# Sessions archived per batch, and chat messages deleted per commit
+ARCHIVE_BATCH_SESSIONS = 200
+DELETE_CHUNK = 500
+
+# Pause between delete chunks, so archival never holds the table for long
+CHUNK_PAUSE = 0.05
+
+
+def archive_file_name(started_at):
+    """Archive file a session belongs to: one gzip JSON-lines file per month the session started in."""
+    return f"chat-{started_at:%Y-%m}.jsonl.gz"
+
+
+def delete_chat_messages(db, *criteria, pause=0):
+    """
+    Delete the chat messages matching criteria in chunks of DELETE_CHUNK rows, one commit per chunk.
+    pause is the number of seconds to sleep between chunks.
+
+    Returns:
+        int: Number of deleted messages.
+    """
+    from models import ChatMessage
+    deleted = 0
+    while True:
+        ids = [message_id for (message_id,) in db.session.query(ChatMessage.id).filter(*criteria).limit(DELETE_CHUNK)]
+        if not ids:
+            return deleted
+        deleted += ChatMessage.query.filter(ChatMessage.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        if len(ids) < DELETE_CHUNK:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+class ChatRetention:
+    """
+    Archives and deletes chat sessions whose last message is older than the
+    retention period of their role.
+
+    Each batch appends the expired sessions (one JSON line per session, with
+    its messages) to per-month gzip files in archive_dir, fsyncs them, and only
+    then deletes the sessions' messages in chunks of DELETE_CHUNK rows, one
+    commit per chunk. The chatmessages table keeps only live history, and no
+    single statement locks many rows.
+
+    If the job is interrupted between writing the archive and deleting, the
+    next run archives those sessions again; archive readers should keep the
+    last line per (user_id, session_id).
+
+    start() runs the job every interval seconds on a daemon thread in each
+    worker process; an flock on archive_dir/.lock makes sure only one of them
+    archives at a time.
+    """
+
+    def __init__(self, app, db, archive_dir, retention_days, interval=0):
+        """
+        Args:
+            app: Flask app.
+            db: Flask-SQLAlchemy database.
+            archive_dir (str): Directory of the monthly archive files.
+            retention_days (dict): Days to keep chat history per role ('user', 'admin');
+                0 or a missing role keeps it forever.
+            interval (int): Seconds between background runs; 0 disables the background job.
+
+        Nothing is archived unless a role has retention days set, so the job is off by default.
+        """
+        self.app = app
+        self.db = db
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.interval = interval
+        self._worker = WorkerThread(self._run, "chat-retention")
+
+    def start(self):
+        """Start the background job in this process if it is enabled and not running yet."""
+        if not self.interval or not any(self.retention_days.values()):
+            return
+        self._worker.ensure_started()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    self.run()
+            except Exception as e:
+                logging.error(f"Chat retention run failed: {e}")
+
+    @contextlib.contextmanager
+    def _job_lock(self):
+        """Yield True if this process may run the job, False if another one is running it."""
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(os.path.join(self.archive_dir, ".lock"), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def run(self, now=None, max_batches=None):
+        """
+        Archive and delete every expired session. Needs an app context.
+
+        Args:
+            now (datetime): Reference time (UTC), defaults to now.
+            max_batches (int): Stop after this many batches (all when None).
+
+        Returns:
+            dict: Number of archived 'sessions' and deleted 'messages'.
+        """
+        now = now or datetime.utcnow()
+        totals = {'sessions': 0, 'messages': 0}
+        with self._job_lock() as acquired:
+            if not acquired:
+                logging.info("Chat retention is already running in another process")
+                return totals
+            for role, days in self.retention_days.items():
+                if not days:
+                    continue
+                cutoff = now - timedelta(days=days)
+                batches = 0
+                while max_batches is None or batches < max_batches:
+                    sessions, messages = self.archive_batch(role, cutoff)
+                    if not sessions:
+                        break
+                    totals['sessions'] += sessions
+                    totals['messages'] += messages
+                    batches += 1
+        if totals['sessions']:
+            logging.info(f"Archived {totals['sessions']} chat sessions ({totals['messages']} messages)")
+        return totals
+
+    def archive_batch(self, role, cutoff):
+        """
+        Archive and delete up to ARCHIVE_BATCH_SESSIONS sessions of a role whose last message is before cutoff.
+
+        Returns:
+            tuple: (archived sessions, deleted messages).
+        """
+        from models import ChatMessage, ChatSession
+        expired = ChatSession.query.filter(
+            ChatSession.user_role == role, ChatSession.last_message_at < cutoff
+        ).order_by(ChatSession.last_message_at.asc()).limit(ARCHIVE_BATCH_SESSIONS).all()
+        if not expired:
+            return 0, 0
+
+        lines = {}
+        message_ids = []
+        archived = []
+        for chat_session in expired:
+            messages = ChatMessage.query.filter_by(
+                user_id=chat_session.user_id, session_id=chat_session.id
+            ).order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc()).all()
+            message_ids.extend(msg.id for msg in messages)
+            archived.append((chat_session.user_id, chat_session.id, len(messages)))
+            record = {
+                'user_id': chat_session.user_id,
+                'session_id': chat_session.id,
+                'user_role': chat_session.user_role,
+                'title': chat_session.title,
+                'started_at': chat_session.started_at.isoformat(),
+                'last_message_at': chat_session.last_message_at.isoformat(),
+                'messages': [
+                    {
+                        'id': msg.id,
+                        'sender': msg.Sender_type,
+                        'message': msg.message,
+                        'timestamp': msg.timestamp.isoformat()
+                    }
+                    for msg in messages
+                ]
+            }
+            lines.setdefault(archive_file_name(chat_session.started_at), []).append(dumps_compact(record))
+        # Release the read transaction before the long-running writes below
+        self.db.session.commit()
+        self._write_archive(lines)
+
+        for start in range(0, len(message_ids), DELETE_CHUNK):
+            chunk = message_ids[start:start + DELETE_CHUNK]
+            ChatMessage.query.filter(ChatMessage.id.in_(chunk)).delete(synchronize_session=False)
+            self.db.session.commit()
+            time.sleep(CHUNK_PAUSE)
+        for user_id, session_id, count in archived:
+            session_filter = (ChatSession.user_id == user_id, ChatSession.id == session_id)
+            if not ChatSession.query.filter(*session_filter, ChatSession.last_message_at < cutoff).delete(synchronize_session=False):
+                # Resumed during archival: the row stays for the new messages
+                ChatSession.query.filter(*session_filter).update(
+                    {ChatSession.message_count: ChatSession.message_count - count}, synchronize_session=False)
+        self.db.session.commit()
+        return len(archived), len(message_ids)
+
+    def _write_archive(self, lines):
+        """Append JSON lines to their archive files and fsync them, one gzip member per batch."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for file_name, records in lines.items():
+            with open(os.path.join(self.archive_dir, file_name), "ab") as f:
+                f.write(gzip.compress(("\n".join(records) + "\n").encode("utf-8")))
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def read_archive(path):
+    """
+    Read the sessions stored in an archive file, keeping the last copy of a session archived twice.
+
+    Returns:
+        list: Session records, in archive order.
+    """
+    sessions = {}
+    # gzip reads the concatenated members appended by each batch as one stream
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                sessions.pop((record['user_id'], record['session_id']), None)
+                sessions[(record['user_id'], record['session_id'])] = record
+    return list(sessions.values())
@@ -1,44 +1,89 @@
+import functools
 import logging
 import string
 import re
+import threading
+import time
 from uuid import uuid4
 
-def simple_tokenize(text):
-    """
-    Simple tokenizer that converts text to lowercase and splits on non-alphanumeric characters, but keeps hyphens in words.
-    """
-    return re.findall(r'\b[\w-]+\b', text.lower())
+from rule_index import simple_tokenize, catalog_preprocess, QuestionIndex, KeywordSetIndex, PrefixIndex, RuleSnapshot, MatchResult
 
 import database.email_directory as email_directory
 import database.user_database.rule_utils as rule_utils
+from database.content_watch import FileChangeWatcher
+from database import content_store
 
 import json
 import os
 
-from nlp_utils import semantic_similarity
+from nlp_utils import TfidfRetriever
+from answer_cache import AnswerCache
+from metrics import registry as metrics_registry
+
+# Data files the chatbot is compiled from, watched for edits made by other workers
+CONTENT_FILES = {
+    "user_rules": os.path.join("database", "user_database", "all_user_rules.json"),
+    "guest_rules": os.path.join("database", "guest_database", "all_guest_rules.json"),
+    "locations": os.path.join("database", "locations", "locations.json"),
+    "visuals": os.path.join("database", "visuals", "visuals.json"),
+    "faqs": os.path.join("database", "faqs.json"),
+}
+
+# Minimum TF-IDF cosine similarity for an FAQ to answer a message
+FAQ_SIMILARITY_THRESHOLD = 0.8
+
+# Latency of Chatbot.match, exported on /metrics
+MATCH_STAGE_SECONDS = metrics_registry.histogram(
+    'doran_match_stage_seconds',
+    'Time spent in each stage of Chatbot.match (cache: answer cache hit).', ['stage'])
+MATCH_SECONDS = metrics_registry.histogram(
+    'doran_match_seconds',
+    'Total time Chatbot.match spent on a message, by the stage that answered it.', ['stage', 'cached'])
+
+def synchronized(method):
+    """
+    Run a Chatbot mutation under the instance write lock.
+    Writers are serialized and publish new snapshots; readers never take the lock.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class Chatbot:
-    def __init__(self):
+    def __init__(self, reload_interval=1.0, cache_size=2048, cache_ttl=300.0):
         # Keep all other initialization code unchanged
 
+        # Answers to repeated questions, keyed by role, message tokens and content version
+        self.answer_cache = AnswerCache(maxsize=cache_size, ttl=cache_ttl)
+
+        # Serializes admin mutations; get_response reads published snapshots without locking
+        self._write_lock = threading.RLock()
+
+        # Stamp the data files before loading them so edits made while loading are picked up
+        # (each source reports a stamp of its data file and journal, or its database version)
+        self.content_watcher = FileChangeWatcher(
+            {name: self.content_document(name).stamp for name in CONTENT_FILES},
+            interval=reload_interval,
+        )
+
         # Initialize rules attributes
         self.rules = self.get_rules()
         self.guest_rules = self.get_guest_rules()
 
         # Load chatbot answer images from locations.json
-        locations_path = os.path.join("database", "locations", "locations.json")
         try:
-            with open(locations_path, "r", encoding="utf-8") as f:
-                locations_data = json.load(f)
-                self.chatbot_images = []
-                for entry in locations_data:
-                    image_entry = {
-                        "id": entry.get("id", ""),
-                        "keywords": entry.get("keywords", []),
-                        "url": entry.get("url", ""),
-                        "description": entry.get("description", "")
-                    }
-                    self.chatbot_images.append(image_entry)
+            locations_data = self.content_document("locations").snapshot()
+            self.chatbot_images = []
+            for entry in locations_data:
+                image_entry = {
+                    "id": entry.get("id", ""),
+                    "keywords": entry.get("keywords", []),
+                    "url": entry.get("url", ""),
+                    "description": entry.get("description", "")
+                }
+                self.chatbot_images.append(image_entry)
         except Exception:
             self.chatbot_images = []
 
@@ -46,19 +91,17 @@ class Chatbot:
         self.location_rules = self.get_location_rules()
 
         # Load visuals answer images from visuals.json
-        visuals_path = os.path.join("database", "visuals", "visuals.json")
         try:
-            with open(visuals_path, "r", encoding="utf-8") as f:
-                visuals_data = json.load(f)
-                self.chatbot_visuals = []
-                for entry in visuals_data:
-                    image_entry = {
-                        "id": entry.get("id", ""),
-                        "keywords": entry.get("keywords", []),
-                        "url": entry.get("url", ""),
-                        "description": entry.get("description", "")
-                    }
-                    self.chatbot_visuals.append(image_entry)
+            visuals_data = self.content_document("visuals").snapshot()
+            self.chatbot_visuals = []
+            for entry in visuals_data:
+                image_entry = {
+                    "id": entry.get("id", ""),
+                    "keywords": entry.get("keywords", []),
+                    "url": entry.get("url", ""),
+                    "description": entry.get("description", "")
+                }
+                self.chatbot_visuals.append(image_entry)
         except Exception:
             self.chatbot_visuals = []
 
@@ -75,12 +118,13 @@ class Chatbot:
         self.email_keywords = ["email", "contact", "mail", "reach", "address", "send", "message"]
 
         # Load FAQs
-        with open('database/faqs.json', 'r', encoding='utf-8') as f:
-            self.faqs = json.load(f)
+        self.faqs = self.load_faqs()
 
-        # Initialize fallback tracking attributes
-        self.consecutive_fallbacks = 0
-        self.fallback_index = 0
+        # Compile the per-role matching snapshots
+        self.compile_snapshots()
+
+        # Fallback tracking (consecutive_fallbacks, fallback_index) is kept per
+        # conversation, see get_response
         self.fallback_responses = [
             "I'm sorry, I didn't quite get that. Could you please rephrase?",
             "Hmm, I'm not sure I understand. Can you try asking differently?",
@@ -89,31 +133,25 @@ class Chatbot:
 
 
 
-    def search_emails(self, user_input):
+    def search_emails(self, user_input, tokens=None):
         """
         Search the email directory for entries matching the user input.
         Returns a response string if matches are found, else None.
         """
-        tokens = simple_tokenize(user_input.lower())
+        if tokens is None:
+            tokens = simple_tokenize(user_input.lower())
         has_email_keyword = any(keyword in tokens for keyword in self.email_keywords)
 
         if not has_email_keyword:
             return None
 
-        # Get all emails
+        # Schools/positions (or their aliases) mentioned in the message, found in one pass
         try:
-            all_emails = email_directory.get_all_emails()
+            matches = email_directory.search_emails(" ".join(tokens))
         except Exception as e:
             logging.error(f"Error fetching emails: {e}")
             return None
 
-        # Find matching schools/positions
-        matches = []
-        for entry in all_emails:
-            school_lower = entry['school'].lower()
-            if any(token in school_lower for token in tokens):
-                matches.append(entry)
-
         if not matches:
             return None
 
@@ -128,50 +166,49 @@ class Chatbot:
         import json
         import os
         rules = []
-        user_rules_path = os.path.join("database", "user_database", "all_user_rules.json")
+        user_rules_path = CONTENT_FILES["user_rules"]
         rules_updated = False
 
         try:
-            with open(user_rules_path, "r", encoding="utf-8") as f:
-                rules_data = json.load(f)
-                # Handle new categorized structure
-                if isinstance(rules_data, dict):
-                    # New categorized structure
-                    for category, category_rules in rules_data.items():
-                        for rule in category_rules:
-                            # Use question as the matching text, not keywords
-                            # Preserve existing ID or generate new one if missing
-                            if 'id' not in rule:
-                                rule['id'] = str(uuid4())
-                                rules_updated = True
-                            rule_id = rule.get("id")
-                            rule_obj = {
-                                "category": category,
-                                "question": rule.get("question", ""),
-                                "response": rule.get("answer", ""),
-                                "id": rule_id
-                            }
-                            rules.append(rule_obj)
-                else:
-                    # Legacy flat array structure (fallback)
-                    for rule in rules_data:
+            # Served from the in-memory rule store; the file is only parsed when it changed
+            rules_data = rule_utils.load_combined_file(user_rules_path)
+            # Handle new categorized structure
+            if isinstance(rules_data, dict):
+                # New categorized structure
+                for category, category_rules in rules_data.items():
+                    for rule in category_rules:
+                        # Use question as the matching text, not keywords
                         # Preserve existing ID or generate new one if missing
                         if 'id' not in rule:
                             rule['id'] = str(uuid4())
                             rules_updated = True
                         rule_id = rule.get("id")
                         rule_obj = {
-                            "category": "combined_user",
+                            "category": category,
                             "question": rule.get("question", ""),
                             "response": rule.get("answer", ""),
                             "id": rule_id
                         }
                         rules.append(rule_obj)
+            else:
+                # Legacy flat array structure (fallback)
+                for rule in rules_data:
+                    # Preserve existing ID or generate new one if missing
+                    if 'id' not in rule:
+                        rule['id'] = str(uuid4())
+                        rules_updated = True
+                    rule_id = rule.get("id")
+                    rule_obj = {
+                        "category": "combined_user",
+                        "question": rule.get("question", ""),
+                        "response": rule.get("answer", ""),
+                        "id": rule_id
+                    }
+                    rules.append(rule_obj)
 
             # Save updated rules back to file if any IDs were added
             if rules_updated:
-                with open(user_rules_path, "w", encoding="utf-8") as f:
-                    json.dump(rules_data, f, indent=4, ensure_ascii=False)
+                rule_utils.save_combined_file(user_rules_path, rules_data)
 
         except Exception:
             # Fallback to original method if combined file not found
@@ -222,50 +259,49 @@ class Chatbot:
         import json
         import os
         rules = []
-        guest_rules_path = os.path.join("database", "guest_database", "all_guest_rules.json")
+        guest_rules_path = CONTENT_FILES["guest_rules"]
         rules_updated = False
 
         try:
-            with open(guest_rules_path, "r", encoding="utf-8") as f:
-                rules_data = json.load(f)
-                # Handle new categorized structure
-                if isinstance(rules_data, dict):
-                    # New categorized structure
-                    for category, category_rules in rules_data.items():
-                        for rule in category_rules:
-                            # Use question as the matching text, not keywords
-                            # Preserve existing ID or generate new one if missing
-                            if 'id' not in rule:
-                                rule['id'] = str(uuid4())
-                                rules_updated = True
-                            rule_id = rule.get("id")
-                            rule_obj = {
-                                "category": category,
-                                "question": rule.get("question", ""),
-                                "response": rule.get("answer", ""),
-                                "id": rule_id
-                            }
-                            rules.append(rule_obj)
-                else:
-                    # Legacy flat array structure (fallback)
-                    for rule in rules_data:
+            # Served from the in-memory rule store; the file is only parsed when it changed
+            rules_data = rule_utils.load_combined_file(guest_rules_path)
+            # Handle new categorized structure
+            if isinstance(rules_data, dict):
+                # New categorized structure
+                for category, category_rules in rules_data.items():
+                    for rule in category_rules:
+                        # Use question as the matching text, not keywords
                         # Preserve existing ID or generate new one if missing
                         if 'id' not in rule:
                             rule['id'] = str(uuid4())
                             rules_updated = True
                         rule_id = rule.get("id")
                         rule_obj = {
-                            "category": "combined_guest",
+                            "category": category,
                             "question": rule.get("question", ""),
                             "response": rule.get("answer", ""),
                             "id": rule_id
                         }
                         rules.append(rule_obj)
+            else:
+                # Legacy flat array structure (fallback)
+                for rule in rules_data:
+                    # Preserve existing ID or generate new one if missing
+                    if 'id' not in rule:
+                        rule['id'] = str(uuid4())
+                        rules_updated = True
+                    rule_id = rule.get("id")
+                    rule_obj = {
+                        "category": "combined_guest",
+                        "question": rule.get("question", ""),
+                        "response": rule.get("answer", ""),
+                        "id": rule_id
+                    }
+                    rules.append(rule_obj)
 
             # Save updated rules back to file if any IDs were added
             if rules_updated:
-                with open(guest_rules_path, "w", encoding="utf-8") as f:
-                    json.dump(rules_data, f, indent=4, ensure_ascii=False)
+                rule_utils.save_combined_file(guest_rules_path, rules_data)
 
         except Exception:
             rules = []
@@ -310,6 +346,145 @@ class Chatbot:
                         continue
         return rules
 
+    def compile_snapshots(self, questions=True, keywords=True, faqs=True):
+        """
+        Build and publish the immutable per-role snapshots (guest / user / admin).
+
+        Args:
+            questions (bool): Recompile the question indexes from self.rules and self.guest_rules.
+            keywords (bool): Recompile the keyword-set indexes from the location and visual rules.
+            faqs (bool): Refit the FAQ retrieval model from self.faqs.
+
+        Parts that are not recompiled are carried over from the current snapshots.
+        Callers must never mutate a rule list in place once it has been compiled;
+        assign a new list and call this method instead. The snapshots are published
+        with a single reference assignment, so concurrent readers always see either
+        the old or the new content, never a mix.
+        """
+        current = getattr(self, 'snapshots', None)
+        version = current['user'].version + 1 if current else 1
+
+        if questions:
+            user_question_index = QuestionIndex(self.rules)
+            guest_question_index = QuestionIndex(self.guest_rules)
+        else:
+            user_question_index = current['user'].question_index
+            guest_question_index = current['guest'].question_index
+
+        if keywords:
+            # Guests never see user-only rules and users/admins never see guest-only rules
+            keyword_rules = self.location_rules + self.visual_rules
+            guest_keyword_index = KeywordSetIndex(
+                [rule for rule in keyword_rules if rule.get('user_type', 'both') != 'user'])
+            member_keyword_index = KeywordSetIndex(
+                [rule for rule in keyword_rules if rule.get('user_type', 'both') != 'guest'])
+        else:
+            guest_keyword_index = current['guest'].keyword_index
+            member_keyword_index = current['user'].keyword_index
+
+        if faqs:
+            faq_list = tuple(self.faqs)
+            faq_retriever = TfidfRetriever(item['question'] for item in faq_list)
+        else:
+            faq_list = current['user'].faqs
+            faq_retriever = current['user'].faq_retriever
+
+        # Type-ahead index over everything the role can ask, kept unless those questions changed
+        # (e.g. when only answers were edited)
+        guest_suggest_index = self.suggest_index(
+            current and current['guest'], self.suggestion_texts(guest_question_index, guest_keyword_index, faq_list))
+        member_suggest_index = self.suggest_index(
+            current and current['user'], self.suggestion_texts(user_question_index, member_keyword_index, faq_list))
+
+        self.snapshots = {
+            'guest': RuleSnapshot('guest', version, guest_keyword_index, guest_question_index, faq_list, faq_retriever,
+                                  guest_suggest_index),
+            'user': RuleSnapshot('user', version, member_keyword_index, user_question_index, faq_list, faq_retriever,
+                                 member_suggest_index),
+            'admin': RuleSnapshot('admin', version, member_keyword_index, user_question_index, faq_list, faq_retriever,
+                                  member_suggest_index),
+        }
+
+    @property
+    def content_version(self):
+        """
+        Generation counter of the compiled content, incremented every time the snapshots are rebuilt.
+        """
+        return self.snapshots['user'].version
+
+    def keyword_set_question(self, rule, keyword_set):
+        """Question text offered for one keyword set of a location or visual rule."""
+        if rule.get("category") == "locations":
+            return "Where is " + " ".join(keyword_set) + "?"
+        return " ".join(keyword_set)
+
+    def suggest_index(self, current, suggestions):
+        """Return the PrefixIndex of suggestions, reusing the one of the current snapshot if they are unchanged."""
+        suggestions = tuple(suggestions)
+        if current is not None and current.suggest_index.source == suggestions:
+            return current.suggest_index
+        return PrefixIndex(suggestions)
+
+    def suggestion_texts(self, question_index, keyword_index, faqs):
+        """Yield the suggestion texts of one role: rule questions, location/visual keyword questions, FAQ questions."""
+        for rule in question_index.rules:
+            yield rule.get("question", "")
+        for rule in keyword_index.rules:
+            for keyword_set in KeywordSetIndex.keyword_sets(rule.get("keywords", [])):
+                yield self.keyword_set_question(rule, keyword_set)
+        for faq in faqs:
+            yield faq.get("question", "")
+
+    def suggest(self, prefix, user_role=None, limit=8):
+        """
+        Return up to limit type-ahead completions of prefix among the questions the role can ask.
+        """
+        snapshots = self.snapshots
+        snapshot = snapshots.get(user_role, snapshots['user'])
+        return snapshot.suggest_index.complete(prefix, limit)
+
+    def question_catalog(self, user_role=None):
+        """
+        Build the question catalog shown in the chat page's questions modal.
+
+        Only the questions the role can actually get answered are included, grouped
+        by category, each with its id, original text and preprocessed text:
+        rule questions, one "Where is ...?" question per location keyword set, and
+        FAQs (filed under every category named in the question, else "General").
+
+        Returns:
+            dict: {"categories": {category: [entry, ...]}}
+        """
+        snapshots = self.snapshots
+        snapshot = snapshots.get(user_role, snapshots['user'])
+        rules_source = "guest_rules" if snapshot.role == 'guest' else "user_rules"
+
+        def entry(entry_id, question):
+            return {"id": entry_id, "original": question, "preprocessed": catalog_preprocess(question)}
+
+        catalog = {category: [] for category in rule_utils.get_store(CONTENT_FILES[rules_source]).categories()}
+        catalog.setdefault("Locations", [])
+        catalog.setdefault("Faculties", [])
+        faq_categories = list(catalog)
+        catalog.setdefault("General", [])
+
+        for rule in snapshot.question_index.rules:
+            catalog.setdefault(rule.get("category", "General"), []).append(entry(rule["id"], rule.get("question", "")))
+
+        for rule in snapshot.keyword_index.rules:
+            if rule.get("category") != "locations":
+                continue
+            for keyword_set in KeywordSetIndex.keyword_sets(rule.get("keywords", [])):
+                catalog["Locations"].append(entry(rule["id"], self.keyword_set_question(rule, keyword_set)))
+
+        for position, faq in enumerate(snapshot.faqs):
+            question = faq.get("question", "")
+            matched = [category for category in faq_categories if category.lower() in question.lower()]
+            for category in matched or ["General"]:
+                catalog[category].append(entry(f"faq-{position}", question))
+
+        return {"categories": catalog}
+
     def normalize_keywords(self, keywords):
         """
         Normalize keywords to lowercase, handling both flat lists and nested lists.
@@ -329,48 +504,46 @@ class Chatbot:
         Load location-based rules from database/locations/locations.json
         Converts each image entry to a rule with keywords and response containing description and all image URLs.
         """
-        locations_path = os.path.join("database", "locations", "locations.json")
         try:
-            with open(locations_path, "r", encoding="utf-8") as f:
-                locations_data = json.load(f)
-                location_rules = []
-                for entry in locations_data:
-                    keywords = self.normalize_keywords(entry.get("keywords", []))
-                    description = entry.get("description", "")
-                    image_urls = entry.get("urls", [])
-                    # Compose response with description and all image HTML tags
-                    images_html = ""
-                    if len(image_urls) > 2:
-                        # Show first image with overlay for additional images
-                        static_img_url = image_urls[0]
-                        if not static_img_url.startswith("/static/"):
-                            static_img_url = "/static/" + static_img_url
-                        additional_count = len(image_urls) - 1
+            locations_data = self.content_document("locations").snapshot()
+            location_rules = []
+            for entry in locations_data:
+                keywords = self.normalize_keywords(entry.get("keywords", []))
+                description = entry.get("description", "")
+                image_urls = entry.get("urls", [])
+                # Compose response with description and all image HTML tags
+                images_html = ""
+                if len(image_urls) > 2:
+                    # Show first image with overlay for additional images
+                    static_img_url = image_urls[0]
+                    if not static_img_url.startswith("/static/"):
+                        static_img_url = "/static/" + static_img_url
+                    additional_count = len(image_urls) - 1
+                    prefixed_urls = ["/static/" + url if not url.startswith("/static/") else url for url in image_urls]
+                    images_html = f"""
+                    <div class="image-gallery" data-images='{",".join(prefixed_urls)}'>
+                        <img src='{static_img_url}' alt='Location Image' class='message-image'>
+                        <div class="image-overlay">+{additional_count} more</div>
+                    </div>
+                    """
+                else:
+                    # Show all images if 2 or fewer
+                    for img_url in image_urls:
+                        static_img_url = img_url
+                        if not img_url.startswith("/static/"):
+                            static_img_url = "/static/" + img_url
                         prefixed_urls = ["/static/" + url if not url.startswith("/static/") else url for url in image_urls]
-                        images_html = f"""
-                        <div class="image-gallery" data-images='{",".join(prefixed_urls)}'>
-                            <img src='{static_img_url}' alt='Location Image' class='message-image'>
-                            <div class="image-overlay">+{additional_count} more</div>
-                        </div>
-                        """
-                    else:
-                        # Show all images if 2 or fewer
-                        for img_url in image_urls:
-                            static_img_url = img_url
-                            if not img_url.startswith("/static/"):
-                                static_img_url = "/static/" + img_url
-                            prefixed_urls = ["/static/" + url if not url.startswith("/static/") else url for url in image_urls]
-                            images_html += f"<img src='{static_img_url}' alt='Location Image' class='message-image' data-images='{','.join(prefixed_urls)}'>"
-                    response = f"{description}<br>{images_html}"
-                    rule = {
-                        "id": entry.get("id", ""),
-                        "keywords": keywords,
-                        "response": response,
-                        "category": "locations",
-                        "user_type": entry.get("user_type", "both")
-                    }
-                    location_rules.append(rule)
-                return location_rules
+                        images_html += f"<img src='{static_img_url}' alt='Location Image' class='message-image' data-images='{','.join(prefixed_urls)}'>"
+                response = f"{description}<br>{images_html}"
+                rule = {
+                    "id": entry.get("id", ""),
+                    "keywords": keywords,
+                    "response": response,
+                    "category": "locations",
+                    "user_type": entry.get("user_type", "both")
+                }
+                location_rules.append(rule)
+            return location_rules
         except Exception:
             return []
 
@@ -379,52 +552,50 @@ class Chatbot:
         Load visual-based rules from database/visuals/visuals.json
         Converts each image entry to a rule with keywords and response containing description and all image URLs.
         """
-        visuals_path = os.path.join("database", "visuals", "visuals.json")
         try:
-            with open(visuals_path, "r", encoding="utf-8") as f:
-                visuals_data = json.load(f)
-                visual_rules = []
-                for entry in visuals_data:
-                    keywords = self.normalize_keywords(entry.get("keywords", []))
-                    description = entry.get("description", "")
-                    image_urls = entry.get("urls", [])
-                    # Compose response with description and all image HTML tags
-                    images_html = ""
-                    if len(image_urls) > 2:
-                        # Show first image with overlay for additional images
-                        static_img_url = image_urls[0]
-                        if not static_img_url.startswith("/static/"):
-                            static_img_url = "/static/" + static_img_url
-                        additional_count = len(image_urls) - 1
+            visuals_data = self.content_document("visuals").snapshot()
+            visual_rules = []
+            for entry in visuals_data:
+                keywords = self.normalize_keywords(entry.get("keywords", []))
+                description = entry.get("description", "")
+                image_urls = entry.get("urls", [])
+                # Compose response with description and all image HTML tags
+                images_html = ""
+                if len(image_urls) > 2:
+                    # Show first image with overlay for additional images
+                    static_img_url = image_urls[0]
+                    if not static_img_url.startswith("/static/"):
+                        static_img_url = "/static/" + static_img_url
+                    additional_count = len(image_urls) - 1
+                    prefixed_urls = ["/static/" + url if not url.startswith("/static/") else url for url in image_urls]
+                    images_html = f"""
+                    <div class="image-gallery" data-images='{",".join(prefixed_urls)}'>
+                        <img src='{static_img_url}' alt='Visual Image' class='message-image'>
+                        <div class="image-overlay">+{additional_count} more</div>
+                    </div>
+                    """
+                else:
+                    # Show all images if 2 or fewer
+                    for img_url in image_urls:
+                        static_img_url = img_url
+                        if not img_url.startswith("/static/"):
+                            static_img_url = "/static/" + img_url
                         prefixed_urls = ["/static/" + url if not url.startswith("/static/") else url for url in image_urls]
-                        images_html = f"""
-                        <div class="image-gallery" data-images='{",".join(prefixed_urls)}'>
-                            <img src='{static_img_url}' alt='Visual Image' class='message-image'>
-                            <div class="image-overlay">+{additional_count} more</div>
-                        </div>
-                        """
-                    else:
-                        # Show all images if 2 or fewer
-                        for img_url in image_urls:
-                            static_img_url = img_url
-                            if not img_url.startswith("/static/"):
-                                static_img_url = "/static/" + img_url
-                            prefixed_urls = ["/static/" + url if not url.startswith("/static/") else url for url in image_urls]
-                            images_html += f"<img src='{static_img_url}' alt='Visual Image' class='message-image' data-images='{','.join(prefixed_urls)}'>"
-                    response = f"{description}<br>{images_html}"
-                    rule = {
-                        "id": entry.get("id", ""),
-                        "keywords": keywords,
-                        "response": response,
-                        "category": "visuals",
-                        "user_type": entry.get("user_type", "user")
-                    }
-                    visual_rules.append(rule)
-                return visual_rules
+                        images_html += f"<img src='{static_img_url}' alt='Visual Image' class='message-image' data-images='{','.join(prefixed_urls)}'>"
+                response = f"{description}<br>{images_html}"
+                rule = {
+                    "id": entry.get("id", ""),
+                    "keywords": keywords,
+                    "response": response,
+                    "category": "visuals",
+                    "user_type": entry.get("user_type", "user")
+                }
+                visual_rules.append(rule)
+            return visual_rules
         except Exception:
             return []
 
-    def get_response(self, user_input, user_role=None):
+    def get_response(self, user_input, user_role=None, conversation=None):
         """
         Generate a response by first checking rule-based matching with all keywords required,
         then falling back to info.json retrieval if no rule matches.
@@ -432,105 +603,204 @@ class Chatbot:
         Args:
             user_input (str): The input message from the user.
             user_role (str): The role of the user ('guest' or other).
+            conversation (dict): Per-conversation state (e.g. the Flask session) used to
+                track consecutive fallbacks and rotate fallback messages. When omitted,
+                no state is kept between calls.
 
         Returns:
             str: The chatbot's response from rules, info.json, or fallback message.
         """
-        if not user_input.strip():
+        if conversation is None:
+            conversation = {}
+
+        result = self.match(user_input, user_role)
+        if result.stage == 'empty':
             return "Please type a message to chat with DORAN."
 
-        # First, try rule-based matching
-        if user_role == 'guest':
-            rules_to_use = self.guest_rules + self.location_rules + self.visual_rules
-            embeddings_to_use = self.guest_rule_embeddings
+        if result.matched:
+            # FAQ answers leave the fallback counter as it is
+            if result.stage != 'faq':
+                self.reset_fallbacks(conversation)
+            return result.response
+
+        # Fallback responses if no match found (never cached: they rotate per conversation)
+        conversation['consecutive_fallbacks'] = conversation.get('consecutive_fallbacks', 0) + 1
+        # Remove fallback to email directory buttons and feedback prompts
+        # Instead, return a simple fallback message without external data
+        fallback_index = conversation.get('fallback_index', 0) % len(self.fallback_responses)
+        fallback = self.fallback_responses[fallback_index]
+        conversation['fallback_index'] = (fallback_index + 1) % len(self.fallback_responses)
+        return self.append_image_to_response(fallback)
+
+    def match(self, user_input, user_role=None):
+        """
+        Find the answer to a message without touching any conversation state.
+
+        Args:
+            user_input (str): The input message from the user.
+            user_role (str): The role of the user ('guest', 'user' or 'admin').
+
+        Returns:
+            MatchResult: The answering stage, matched rule, score, response and stage timings.
+        """
+        if not user_input.strip():
+            return MatchResult('empty')
+
+        # Pick up rule files edited by other workers (throttled, usually a no-op)
+        self.refresh_if_changed()
+
+        # Tokenize the message once for every matching stage
+        tokens = simple_tokenize(user_input.lower())
+
+        # Match against the snapshot compiled for this role
+        # (anything other than guest/admin is matched as a regular user)
+        snapshots = self.snapshots
+        snapshot = snapshots.get(user_role, snapshots['user'])
+
+        # The same message (up to case and surrounding whitespace) gets the same answer
+        # until rules, FAQs, locations, visuals or the email directory change
+        start = time.perf_counter()
+        cache_key = self.answer_key(snapshot, user_input, email_directory.directory_generation())
+        cached = self.answer_cache.get(cache_key)
+        if cached is not None:
+            result = cached.replace(timings={'cache': time.perf_counter() - start}, cached=True)
         else:
-            rules_to_use = self.rules + self.location_rules + self.visual_rules
-            embeddings_to_use = self.user_rule_embeddings
+            result = self.match_stages(user_input, tokens, snapshot)
+            if result.matched:
+                self.answer_cache.put(cache_key, result)
+
+        total = 0.0
+        for stage, seconds in result.timings.items():
+            MATCH_STAGE_SECONDS.observe(seconds, stage)
+            total += seconds
+        MATCH_SECONDS.observe(total, result.stage, 'true' if result.cached else 'false')
+        return result
+
+    @staticmethod
+    def answer_key(snapshot, user_input, email_generation):
+        """
+        Answer cache key of a message: role, text and the versions of everything the answer depends on.
+
+        The key holds the lowercased text rather than its simple_tokenize tokens: the FAQ
+        stage tokenizes the text itself, so messages with equal tokens ("can't" and
+        "can t") may still get different FAQ scores.
+        """
+        return (snapshot.role, user_input.strip().lower(), snapshot.version, email_generation)
 
-        best_match = None
-        best_similarity = 0
+    def match_stages(self, user_input, tokens, snapshot):
+        """
+        Run the matching stages for one message against a role snapshot, timing each of them.
+
+        Returns:
+            MatchResult: For the first stage that matches, else a 'fallback' result.
+        """
+        timings = {}
+        start = time.perf_counter()
 
         # First, check locations and visuals with exact keyword matching
-        for rule in rules_to_use:
-            category = rule.get('category', '')
-            rule_user_type = rule.get('user_type', 'both')
-            if category in ['locations', 'visuals']:
-                # Check user type access
-                if user_role == 'guest' and rule_user_type == 'user':
-                    continue  # Skip user-only rules for guests
-                elif user_role != 'guest' and rule_user_type == 'guest':
-                    continue  # Skip guest-only rules for users/admins
-                rule_keywords = rule.get('keywords', [])
-                if rule_keywords:
-                    tokens = simple_tokenize(user_input.lower())
-                    # Check if any keyword set matches (all keywords in set present)
-                    for keyword_set in rule_keywords:
-                        if isinstance(keyword_set, list):
-                            matches = sum(1 for keyword in keyword_set if keyword in tokens)
-                            if matches == len(keyword_set) and matches > best_similarity:
-                                best_similarity = matches
-                                best_match = rule
-                        else:
-                            # Backward compatibility: flat list
-                            matches = sum(1 for keyword in rule_keywords if keyword in tokens)
-                            if matches == len(rule_keywords) and matches > best_similarity:
-                                best_similarity = matches
-                                best_match = rule
+        best_match, best_similarity = snapshot.keyword_index.best_match(tokens)
+        now = time.perf_counter()
+        timings['keyword'], start = now - start, now
 
         # Semantic rules not used with NLTK
 
         if best_match:
-            self.consecutive_fallbacks = 0
-            return self.append_image_to_response(best_match['response'])
-
-        # Check regular rules (user/guest rules) with keyword matching - all keywords must be present
-        regular_rules = [rule for rule in rules_to_use if rule.get('category') not in ['locations', 'visuals']]
-        if regular_rules:
-            tokens = simple_tokenize(user_input.lower())
-            best_match = None
-            best_match_score = 0
-
-            for rule in regular_rules:
-                question = rule['question'].lower()
-                question_tokens = simple_tokenize(question)
+            return MatchResult('keyword', best_match.get('id'), best_match.get('category'), best_similarity,
+                               self.append_image_to_response(best_match['response']), timings)
 
-                # Check if all question tokens are present in user input
-                if all(token in tokens for token in question_tokens):
-                    # Calculate match score based on number of matching tokens
-                    match_score = len(question_tokens)
-                    if match_score > best_match_score:
-                        best_match_score = match_score
-                        best_match = rule
+        # Check regular rules (user/guest rules) with keyword matching - all question tokens must be present
+        if len(snapshot.question_index):
+            best_match, best_match_score = snapshot.question_index.best_match(tokens)
+            now = time.perf_counter()
+            timings['question'], start = now - start, now
 
             if best_match:
-                self.consecutive_fallbacks = 0
-                return self.append_image_to_response(best_match['response'])
+                return MatchResult('question', best_match.get('id'), best_match.get('category'), best_match_score,
+                                   self.append_image_to_response(best_match['response']), timings)
 
         # Check for email queries
-        email_response = self.search_emails(user_input)
+        email_response = self.search_emails(user_input, tokens)
+        now = time.perf_counter()
+        timings['email'], start = now - start, now
         if email_response:
-            self.consecutive_fallbacks = 0
-            return self.append_image_to_response(email_response)
+            return MatchResult('email', response=self.append_image_to_response(email_response), timings=timings)
 
         # If no rule matches, fallback to faqs.json retrieval
-        questions = [item['question'] for item in self.faqs]
-        answers = [item['answer'] for item in self.faqs]
-
-        # Try faqs retrieval using semantic similarity
-        best_question, similarity_score = semantic_similarity(user_input, questions)
-        SIMILARITY_THRESHOLD = 0.8
-        if similarity_score >= SIMILARITY_THRESHOLD:
-            index = questions.index(best_question)
-            response = answers[index]
-            return self.append_image_to_response(response)
-
-        # Fallback responses if no match found
-        self.consecutive_fallbacks += 1
-        # Remove fallback to email directory buttons and feedback prompts
-        # Instead, return a simple fallback message without external data
-        fallback = self.fallback_responses[self.fallback_index]
-        self.fallback_index = (self.fallback_index + 1) % len(self.fallback_responses)
-        return self.append_image_to_response(fallback)
+        # Try faqs retrieval using the prefit TF-IDF model
+        index, similarity_score = snapshot.faq_retriever.query(user_input)
+        timings['faq'] = time.perf_counter() - start
+        return self.faq_result(snapshot, index, similarity_score, timings)
+
+    def faq_result(self, snapshot, index, similarity_score, timings=None):
+        """MatchResult of the FAQ stage: the FAQ at index if it is similar enough, else a fallback."""
+        if index is not None and similarity_score >= FAQ_SIMILARITY_THRESHOLD:
+            response = snapshot.faqs[index]['answer']
+            return MatchResult('faq', f"faq-{index}", 'faqs', similarity_score,
+                               self.append_image_to_response(response), timings)
+        return MatchResult('fallback', score=similarity_score, timings=timings)
+
+    def get_responses(self, queries, user_role=None, warm_cache=False):
+        """
+        Answer many messages at once, e.g. for evaluation, regression tests or cache preloading.
+
+        Runs the same stages as match() against one snapshot of the role's
+        content, but tokenizes every message up front and scores all messages
+        left for the FAQ stage with one sparse matrix product. No conversation
+        state is read or written. Results carry no per-stage timings.
+
+        Args:
+            queries (list): Messages.
+            user_role (str): Role to answer as ('guest', 'user' or 'admin').
+            warm_cache (bool): Store the matched answers in the answer cache, so
+                later get_response calls for the same messages are cache hits.
+
+        Returns:
+            list: One MatchResult per message, in order.
+        """
+        self.refresh_if_changed()
+        snapshots = self.snapshots
+        snapshot = snapshots.get(user_role, snapshots['user'])
+        email_generation = email_directory.directory_generation()
+
+        queries = list(queries)
+        token_lists = [simple_tokenize(query.lower()) for query in queries]
+        results = [None] * len(queries)
+        unmatched = []
+        for position, (query, tokens) in enumerate(zip(queries, token_lists)):
+            if not query.strip():
+                results[position] = MatchResult('empty')
+                continue
+            for stage, index in (('keyword', snapshot.keyword_index), ('question', snapshot.question_index)):
+                rule, score = index.best_match(tokens)
+                if rule:
+                    results[position] = MatchResult(stage, rule.get('id'), rule.get('category'), score,
+                                                    self.append_image_to_response(rule['response']))
+                    break
+            if results[position] is not None:
+                continue
+            email_response = self.search_emails(query, tokens)
+            if email_response:
+                results[position] = MatchResult('email', response=self.append_image_to_response(email_response))
+                continue
+            unmatched.append(position)
+
+        faq_matches = snapshot.faq_retriever.query_many(queries[position] for position in unmatched)
+        for position, (index, score) in zip(unmatched, faq_matches):
+            results[position] = self.faq_result(snapshot, index, score)
+
+        if warm_cache:
+            for query, result in zip(queries, results):
+                if result.matched:
+                    self.answer_cache.put(self.answer_key(snapshot, query, email_generation), result)
+        return results
+
+    def reset_fallbacks(self, conversation):
+        """
+        Reset the consecutive fallback counter of a conversation after a match.
+        Only writes when needed so a Flask session is not marked modified on every message.
+        """
+        if conversation.get('consecutive_fallbacks'):
+            conversation['consecutive_fallbacks'] = 0
 
     def append_image_to_response(self, response_text, rule_keywords=None):
         """
@@ -557,6 +827,7 @@ class Chatbot:
                         image_url = image.get("url", "")
         return response_text
 
+    @synchronized
     def add_rule(self, question, response, user_type='user', category='soict'):
         from uuid import uuid4
         if category == "locations":
@@ -567,8 +838,8 @@ class Chatbot:
                 "response": response,
                 "category": category
             }
-            self.location_rules.append(new_rule)
-            self.save_location_rules()
+            self.content_document("locations").apply({"op": "append", "path": [], "value": self.rule_to_record(new_rule)})
+            self.reload_sources(["locations"])
             return {"location": new_rule["id"]}
         elif category == "visuals":
             # Add visual rule directly to visual_rules list
@@ -578,8 +849,8 @@ class Chatbot:
                 "response": response,
                 "category": category
             }
-            self.visual_rules.append(new_rule)
-            self.save_visual_rules()
+            self.content_document("visuals").apply({"op": "append", "path": [], "value": self.rule_to_record(new_rule)})
+            self.reload_sources(["visuals"])
             return {"visual": new_rule["id"]}
         else:
             # Use the centralized add_rule function from rule_utils to add and save rules
@@ -587,82 +858,42 @@ class Chatbot:
             added_id = rule_utils.add_rule(user_type, category, question, response)
 
             # Reload rules to update in-memory state without double-saving
+            changed = []
             if user_type == 'user' or user_type == 'both':
-                self.rules = self.get_rules()
+                changed.append("user_rules")
             if user_type == 'guest' or user_type == 'both':
-                self.guest_rules = self.get_guest_rules()
+                changed.append("guest_rules")
+            self.reload_sources(changed)
             # Recompute embeddings after adding rules if available
             # (No embeddings used with NLTK)
             return {"user": added_id} if user_type == "user" else {"guest": added_id}
 
-    def save_location_rules(self):
-        """
-        Save the current location rules to database/locations/locations.json.
-        """
-        import json
-        locations_path = os.path.join("database", "locations", "locations.json")
-        try:
-            # Convert location_rules to the format expected in locations.json
-            locations_data = []
-            for rule in self.location_rules:
-                # Extract image URL from response HTML if possible
-                import re
-                url_match = re.search(r"<img src='([^']+)'", rule.get("response", ""))
-                url = url_match.group(1) if url_match else ""
-                # Remove /static/ prefix if present
-                if url.startswith("/static/"):
-                    url = url[len("/static/"): ]
-                # Extract description (text before <br>)
-                description = rule.get("response", "").split("<br>")[0]
-                locations_data.append({
-                    "id": rule.get("id", ""),
-                    "keywords": rule.get("keywords", []),
-                    "url": url,
-                    "description": description
-                })
-            with open(locations_path, "w", encoding="utf-8") as f:
-                logging.info("Saving location rules to %s", locations_path)
-                json.dump(locations_data, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            import logging
-            logging.error(f"Error saving location rules to {locations_path}: {e}")
+    def content_document(self, name):
+        """Return the document (see database.content_store) behind a source in CONTENT_FILES."""
+        if name in ("user_rules", "guest_rules"):
+            return rule_utils.get_store(CONTENT_FILES[name]).document
+        return content_store.get_document(CONTENT_FILES[name], [], kind=name)
 
-    def save_visual_rules(self):
+    def rule_to_record(self, rule):
         """
-        Save the current visual rules to database/visuals/visuals.json.
+        Convert an in-memory location/visual rule back to its JSON record.
+        Image URLs are recovered from the response HTML and the description is the text before <br>.
         """
-        import json
-        visuals_path = os.path.join("database", "visuals", "visuals.json")
-        try:
-            # Convert visual_rules to the format expected in visuals.json
-            visuals_data = []
-            for rule in self.visual_rules:
-                # Extract image URLs from response HTML
-                import re
-                img_matches = re.findall(r"<img src='([^']+)'", rule.get("response", ""))
-                urls = []
-                for img_url in img_matches:
-                    if img_url.startswith("/static/"):
-                        img_url = img_url[len("/static/"): ]
-                    urls.append(img_url)
-                # Primary url
-                url = urls[0] if urls else ""
-                # Extract description (text before <br>)
-                description = rule.get("response", "").split("<br>")[0]
-                visuals_data.append({
-                    "id": rule.get("id", ""),
-                    "keywords": rule.get("keywords", []),
-                    "url": url,
-                    "urls": urls,
-                    "description": description
-                })
-            with open(visuals_path, "w", encoding="utf-8") as f:
-                logging.info("Saving visual rules to %s", visuals_path)
-                json.dump(visuals_data, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            import logging
-            logging.error(f"Error saving visual rules to {visuals_path}: {e}")
-
+        urls = []
+        for img_url in re.findall(r"<img src='([^']+)'", rule.get("response", "")):
+            # Remove /static/ prefix if present
+            if img_url.startswith("/static/"):
+                img_url = img_url[len("/static/"):]
+            urls.append(img_url)
+        return {
+            "id": rule.get("id", ""),
+            "keywords": rule.get("keywords", []),
+            "url": urls[0] if urls else "",
+            "urls": urls,
+            "description": rule.get("response", "").split("<br>")[0],
+        }
+
+    @synchronized
     def delete_rule(self, rule_id, user_type=None):
         import logging
         logging.debug(f"Deleting rule with id: {rule_id}, user_type: {user_type}")
@@ -675,11 +906,10 @@ class Chatbot:
                 logging.debug(f"Checking guest rule id: {rule.get('id')}")
                 if str(rule.get("id")) == str(rule_id):
                     category = rule.get("category", "SOICT")
-                    del self.guest_rules[i]
                     # Remove from JSON file using rule_utils
                     from database.user_database import rule_utils
                     deleted = rule_utils.delete_rule(rule_id, user_type='guest', category=category)
-                    self.guest_rules = self.get_guest_rules()
+                    self.reload_sources(["guest_rules"])
                     logging.debug(f"Rule with id {rule_id} deleted from guest rules.")
                     return deleted
 
@@ -688,13 +918,11 @@ class Chatbot:
                 logging.debug(f"Checking user rule id: {rule.get('id')}")
                 if str(rule.get("id")) == str(rule_id):
                     category = rule.get("category", "SOICT")
-                    # Remove from in-memory list
-                    del self.rules[i]
                     # Remove from JSON file using rule_utils
                     from database.user_database import rule_utils
                     deleted = rule_utils.delete_rule(rule_id, user_type='user', category=category)
                     # Reload rules
-                    self.rules = self.get_rules()
+                    self.reload_sources(["user_rules"])
                     # Recompute embeddings after deleting rules if available
                     # (No embeddings used with NLTK)
                     logging.debug(f"Rule with id {rule_id} deleted from user rules.")
@@ -705,13 +933,11 @@ class Chatbot:
                 logging.debug(f"Checking user rule id: {rule.get('id')}")
                 if str(rule.get("id")) == str(rule_id):
                     category = rule.get("category", "SOICT")
-                    # Remove from in-memory list
-                    del self.rules[i]
                     # Remove from JSON file using rule_utils
                     from database.user_database import rule_utils
                     deleted = rule_utils.delete_rule(rule_id, user_type='user', category=category)
                     # Reload rules
-                    self.rules = self.get_rules()
+                    self.reload_sources(["user_rules"])
                     logging.debug(f"Rule with id {rule_id} deleted from user rules.")
                     return deleted
 
@@ -721,11 +947,10 @@ class Chatbot:
                 logging.debug(f"Checking guest rule id: {rule.get('id')}")
                 if str(rule.get("id")) == str(rule_id):
                     category = rule.get("category", "SOICT")
-                    del self.guest_rules[i]
                     # Remove from JSON file using rule_utils
                     from database.user_database import rule_utils
                     deleted = rule_utils.delete_rule(rule_id, user_type='guest', category=category)
-                    self.guest_rules = self.get_guest_rules()
+                    self.reload_sources(["guest_rules"])
                     # Recompute embeddings after deleting rules if available
                     # (No embeddings used with NLTK)
                     logging.debug(f"Rule with id {rule_id} deleted from guest rules.")
@@ -736,9 +961,8 @@ class Chatbot:
             for i, rule in enumerate(self.location_rules):
                 logging.debug(f"Checking location rule id: {rule.get('id')}")
                 if str(rule.get("id")) == str(rule_id):
-                    del self.location_rules[i]
-                    self.save_location_rules()
-                    self.location_rules = self.get_location_rules()
+                    self.content_document("locations").apply({"op": "delete_id", "path": [], "id": str(rule_id)})
+                    self.reload_sources(["locations"])
                     logging.debug(f"Rule with id {rule_id} deleted from location rules.")
                     deleted = True
                     break
@@ -748,14 +972,14 @@ class Chatbot:
             for i, rule in enumerate(self.visual_rules):
                 logging.debug(f"Checking visual rule id: {rule.get('id')}")
                 if str(rule.get("id")) == str(rule_id):
-                    del self.visual_rules[i]
-                    self.save_visual_rules()
-                    self.visual_rules = self.get_visual_rules()
+                    self.content_document("visuals").apply({"op": "delete_id", "path": [], "id": str(rule_id)})
+                    self.reload_sources(["visuals"])
                     logging.debug(f"Rule with id {rule_id} deleted from visual rules.")
                     deleted = True
                     break
         return deleted
 
+    @synchronized
     def edit_rule(self, rule_id, question, response, user_type='user'):
         # Edit rule in user, guest, or location rules
         edited = False
@@ -770,69 +994,125 @@ class Chatbot:
             rules_list = self.rules
 
         # Edit rules in the selected list
-        for rule in rules_list:
+        for i, rule in enumerate(rules_list):
             if str(rule.get("id")) == str(rule_id):
                 category = rule.get("category", "SOICT")
                 # Use rule_utils to edit the rule
                 from database.user_database import rule_utils
                 edited = rule_utils.edit_rule(rule_id, question, response, user_type=user_type, category=category)
-                # Update in-memory rule
-                rule["question"] = question
-                rule["response"] = response
+                # Replace the in-memory rule (copy-on-write, compiled lists are never mutated)
+                edited_rule = dict(rule, question=question, response=response)
+                new_rules = rules_list[:i] + [edited_rule] + rules_list[i + 1:]
+                if rules_list is self.guest_rules:
+                    self.guest_rules = new_rules
+                else:
+                    self.rules = new_rules
+                self.compile_snapshots(keywords=False, faqs=False)
                 # Recompute embeddings after editing rules if available
                 # (No embeddings used with NLTK)
                 break
 
         if not edited:
             # Edit location rules (if not found in user/guest rules)
-            for rule in self.location_rules:
+            for i, rule in enumerate(self.location_rules):
                 if str(rule.get("id")) == str(rule_id):
-                    rule["keywords"] = question.lower().split()  # Convert question to keywords for locations
-                    rule["response"] = response
-                    self.save_location_rules()
+                    # Convert question to keywords for locations
+                    # (only the keywords and description change, the images are kept)
+                    self.content_document("locations").apply({"op": "update_id", "path": [], "id": str(rule_id), "value": {
+                        "keywords": question.lower().split(),
+                        "description": response.split("<br>")[0],
+                    }})
+                    self.reload_sources(["locations"])
                     edited = True
                     break
 
         if not edited:
             # Edit visual rules (if not found in user/guest rules)
-            for rule in self.visual_rules:
+            for i, rule in enumerate(self.visual_rules):
                 if str(rule.get("id")) == str(rule_id):
-                    rule["keywords"] = question.lower().split()  # Convert question to keywords for visuals
-                    rule["response"] = response
-                    self.save_visual_rules()
+                    # Convert question to keywords for visuals
+                    # (only the keywords and description change, the images are kept)
+                    self.content_document("visuals").apply({"op": "update_id", "path": [], "id": str(rule_id), "value": {
+                        "keywords": question.lower().split(),
+                        "description": response.split("<br>")[0],
+                    }})
+                    self.reload_sources(["visuals"])
                     edited = True
                     break
         return edited
 
-    def reload_faqs(self):
+    def load_faqs(self):
         """
-        Reload FAQs from database/faqs.json into memory.
+        Load FAQs from database/faqs.json. Returns an empty list on error.
         """
         try:
-            with open('database/faqs.json', 'r', encoding='utf-8') as f:
-                self.faqs = json.load(f)
+            return self.content_document("faqs").snapshot()
         except Exception as e:
             logging.error(f"Error reloading FAQs: {e}")
-            self.faqs = []
+            return []
+
+    def refresh_if_changed(self):
+        """
+        Reload the data files that changed on disk since they were last loaded,
+        e.g. after an admin edit handled by another gunicorn worker.
+        The check is throttled by the watcher interval, so this is cheap to call per request.
+
+        Returns:
+            list: Names of the reloaded sources (see CONTENT_FILES).
+        """
+        changed = self.content_watcher.poll()
+        if changed:
+            logging.info("Reloading changed content: %s", ", ".join(changed))
+            self.reload_sources(changed)
+        return changed
+
+    @synchronized
+    def reload_sources(self, names):
+        """
+        Reload the given sources (keys of CONTENT_FILES) from disk and recompile
+        only the indexes that depend on them.
+        """
+        names = set(names)
+        self.content_watcher.mark_current(*names)
+        if "user_rules" in names:
+            self.rules = self.get_rules()
+        if "guest_rules" in names:
+            self.guest_rules = self.get_guest_rules()
+        if "locations" in names:
+            self.location_rules = self.get_location_rules()
+        if "visuals" in names:
+            self.visual_rules = self.get_visual_rules()
+        if "faqs" in names:
+            self.faqs = self.load_faqs()
+        self.compile_snapshots(
+            questions=bool(names & {"user_rules", "guest_rules"}),
+            keywords=bool(names & {"locations", "visuals"}),
+            faqs="faqs" in names,
+        )
+
+    def reload_faqs(self):
+        """
+        Reload FAQs from database/faqs.json into memory.
+        """
+        self.reload_sources(["faqs"])
 
     def reload_location_rules(self):
         """
         Reload location rules from database/locations/locations.json into memory.
         """
-        self.location_rules = self.get_location_rules()
+        self.reload_sources(["locations"])
 
     def reload_visual_rules(self):
         """
         Reload visual rules from database/visuals/visuals.json into memory.
         """
-        self.visual_rules = self.get_visual_rules()
+        self.reload_sources(["visuals"])
 
     def reload_rules(self):
         """
         Reload user and guest rules from JSON files into memory.
         """
-        self.rules = self.get_rules()
-        self.guest_rules = self.get_guest_rules()
+        self.reload_sources(["user_rules", "guest_rules"])
 
     def recompute_embeddings(self):
         """
@@ -0,0 +1,19 @@
+import pytest
+from flask import Flask
+
+from extensions import db
+
+
+@pytest.fixture
+def app():
+    """Flask app on an in-memory SQLite database with every table created."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        import models  # noqa: F401  (registers the tables)
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,40 @@
+import os
+import threading
+
+from database import journal
+
+# "json" (data files + journals, the default) or "sqlite"
+CONTENT_BACKEND = os.environ.get("CONTENT_BACKEND", "json").lower()
+
+# SQLite database used by the sqlite backend
+CONTENT_DB_PATH = os.environ.get(
+    "CONTENT_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "content.db"),
+)
+
+_imported = set()
+_import_lock = threading.Lock()
+
+
+def sqlite_enabled():
+    return CONTENT_BACKEND == "sqlite"
+
+
+def get_document(path, default, kind=None):
+    """
+    Return the document holding a piece of content.
+
+    With the default json backend this is the journaled data file at path. With
+    CONTENT_BACKEND=sqlite, content of a known kind (user_rules, guest_rules,
+    faqs, locations, visuals) lives in CONTENT_DB_PATH instead; the first time a
+    kind is used there, it is imported from its JSON file.
+    """
+    if kind is None or not sqlite_enabled():
+        return journal.get_document(path, default)
+
+    from database import sqlite_content
+    with _import_lock:
+        if kind not in _imported:
+            sqlite_content.import_json(CONTENT_DB_PATH, {kind: journal.get_document(path, default)})
+            _imported.add(kind)
+    return sqlite_content.get_document(CONTENT_DB_PATH, kind)
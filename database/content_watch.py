@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+
+def file_stamp(path):
+    """
+    Return a cheap change stamp for a file: (mtime_ns, size, inode), or None if it is missing.
+    The inode changes when a file is replaced by rename, the mtime and size when it is rewritten.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def source_stamp(paths):
+    """
+    Return the change stamp of a source: one file path, a tuple of paths, or a
+    callable returning the stamp itself (e.g. a database version counter).
+    """
+    if callable(paths):
+        return paths()
+    if isinstance(paths, (tuple, list)):
+        return tuple(file_stamp(path) for path in paths)
+    return file_stamp(paths)
+
+
+class FileChangeWatcher:
+    """
+    Detects changes to a set of named data files made by any process.
+
+    Every gunicorn worker keeps its own watcher. poll() stats the files at most
+    once per interval, so calling it on every request is cheap, and returns the
+    names of the files whose stamp changed since they were last seen.
+    """
+
+    def __init__(self, paths, interval=1.0):
+        """
+        Args:
+            paths (dict): Mapping of source name to a file path, a tuple of paths that
+                together make up the source (e.g. a data file and its journal), or a
+                callable returning a change stamp.
+            interval (float): Minimum number of seconds between two checks.
+        """
+        self.paths = dict(paths)
+        self.interval = interval
+        self._stamps = {name: source_stamp(path) for name, path in self.paths.items()}
+        self._next_check = time.monotonic() + interval
+        self._lock = threading.Lock()
+
+    def mark_current(self, *names):
+        """
+        Record the current stamp of the given sources (all if none given).
+        Call this right before (re)loading a source so the load is not reported as a change.
+        """
+        with self._lock:
+            for name in names or self.paths:
+                self._stamps[name] = source_stamp(self.paths[name])
+
+    def poll(self, force=False):
+        """
+        Return the names of the sources that changed since the last poll.
+        Returns an empty list when the interval has not elapsed yet or another
+        thread is already checking.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return []
+        if not self._lock.acquire(blocking=False):
+            return []
+        try:
+            self._next_check = now + self.interval
+            changed = []
+            for name, path in self.paths.items():
+                stamp = source_stamp(path)
+                if stamp != self._stamps[name]:
+                    self._stamps[name] = stamp
+                    changed.append(name)
+            return changed
+        finally:
+            self._lock.release()
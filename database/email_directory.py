@@ -1,15 +1,176 @@
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
 from models import EmailDirectory
 from extensions import db
+from database.content_watch import FileChangeWatcher
+from rule_index import CATALOG_STOPWORDS, PhraseMatcher, simple_tokenize
+
+# Touched on every change to the directory, so each worker's cache notices edits made by other workers
+STAMP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "email_directory.stamp")
+
+# Minimum number of seconds between two checks of the stamp file
+RELOAD_INTERVAL = float(os.environ.get("CONTENT_RELOAD_INTERVAL", "1.0"))
+
+# Entries in directory order, and an automaton finding the entries whose names or aliases a message mentions
+EmailSnapshot = namedtuple("EmailSnapshot", ["entries", "matcher"])
+
+# Words that name the kind of office rather than which one it is ("Guidance Office" is found by "guidance");
+# "email" and "contact" are here because every directory query contains them
+GENERIC_WORDS = frozenset([
+    "office", "offices", "department", "dept", "college", "school", "center", "centre", "unit", "section",
+    "division", "service", "services", "university", "campus", "email", "mail", "contact",
+])
+
+# Words left out of acronyms ("College of Arts and Sciences" -> "cas")
+ACRONYM_SKIP = frozenset(["of", "and", "the", "for", "in", "on"])
+
+# Separators between the parts of a name ("Dean, College of Nursing")
+PART_SEPARATORS = re.compile(r"[,/()\[\]|:;\u2013\u2014]|\s-\s")
+
+# Possessive endings, dropped so "Registrar's Office" is found by "registrar"
+POSSESSIVE = re.compile(r"(?<=\w)['\u2019]s\b", re.IGNORECASE)
+
+
+def name_words(text):
+    """Lowercase words of a name or message with possessives removed ("registrar's" and "registrar s" -> "registrar")."""
+    return [word for word in simple_tokenize(POSSESSIVE.sub("", text)) if word != "s"]
+
+
+def distinctive(word):
+    """Whether a word of a name tells offices apart (not a stopword, generic word or single letter)."""
+    return len(word) > 1 and word not in CATALOG_STOPWORDS and word not in GENERIC_WORDS
+
+
+def acronym(words):
+    """Lowercase initials of words."""
+    return "".join(word[0] for word in words).lower()
+
+
+def school_aliases(school):
+    """
+    Names a message may use for a directory entry, as space-separated words:
+    each part of the name ("Dean, College of Nursing" -> "dean", "college of
+    nursing"), every run of words in a part that starts and ends with a
+    distinctive word ("nursing", "soict", "student affairs"), and the acronym
+    of a part with three or more words ("osas"). Parts already containing an
+    acronym ("College of ICT") get none of their own.
+    """
+    aliases = set()
+    for part in PART_SEPARATORS.split(school):
+        words = name_words(part)
+        if not words:
+            continue
+        aliases.add(" ".join(words))
+        for start, first in enumerate(words):
+            if not distinctive(first):
+                continue
+            for end in range(start, len(words)):
+                if distinctive(words[end]):
+                    aliases.add(" ".join(words[start:end + 1]))
+
+        # Two-letter acronyms are left out since they are usually ordinary words ("Guidance Office" -> "go")
+        written = [word for word in re.findall(r"[\w-]+", POSSESSIVE.sub("", part)) if word.lower() not in ACRONYM_SKIP]
+        if len(written) >= 3 and not any(word.isupper() and len(word) > 1 for word in written):
+            aliases.add(acronym(written))
+    # An alias must name something: no stopword-only or generic-only aliases ("office", "it")
+    return {alias for alias in aliases if any(distinctive(word) for word in alias.split()) and alias not in CATALOG_STOPWORDS}
+
+
+def build_snapshot(entries):
+    """Compile the names and aliases of the directory entries into one PhraseMatcher."""
+    matcher = PhraseMatcher(
+        (alias, position)
+        for position, entry in enumerate(entries)
+        for alias in school_aliases(entry["school"])
+    )
+    return EmailSnapshot(entries, matcher)
+
+
+class EmailDirectoryCache:
+    """
+    In-memory copy of the email directory table.
+
+    The table is read once (and its names compiled into a PhraseMatcher)
+    and then served from memory until it changes:
+    add_email/update_email/delete_email drop the cache and touch STAMP_PATH,
+    which the other workers notice through a FileChangeWatcher.
+    """
+
+    def __init__(self, stamp_path=STAMP_PATH, interval=RELOAD_INTERVAL):
+        self.stamp_path = stamp_path
+        self.watcher = FileChangeWatcher({"emails": stamp_path}, interval=interval)
+        self._snapshot = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self):
+        """
+        Counter incremented whenever the directory changes (in this worker or,
+        once the watcher notices, in another). Does not touch the database.
+        """
+        if self.watcher.poll():
+            with self._lock:
+                self._snapshot = None
+                self._generation += 1
+        return self._generation
+
+    def snapshot(self):
+        """Return the current EmailSnapshot, loading it from the database if needed. Needs an app context."""
+        self.generation()
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    self.watcher.mark_current()
+                    entries = tuple(
+                        {"id": e.id, "school": e.school, "email": e.email}
+                        for e in EmailDirectory.query.order_by(EmailDirectory.id).all()
+                    )
+                    snapshot = self._snapshot = build_snapshot(entries)
+        return snapshot
+
+    def invalidate(self):
+        """Drop the cached directory in this worker and signal the change to the others."""
+        with self._lock:
+            with open(self.stamp_path, "w") as f:
+                f.write(str(time.time_ns()))
+            # This worker already knows: its watcher must not report the touch as another change
+            self.watcher.mark_current()
+            self._snapshot = None
+            self._generation += 1
+
+    def search(self, text):
+        """
+        Return the entries whose school name or an alias of it is mentioned in text, in directory order.
+        One pass over the text, however many entries the directory has.
+        """
+        snapshot = self.snapshot()
+        positions = snapshot.matcher.find(" ".join(name_words(text)))
+        return [dict(snapshot.entries[position]) for position in sorted(positions)]
+
+
+directory = EmailDirectoryCache()
 
 def get_all_emails():
-    emails = EmailDirectory.query.all()
-    return [{"id": e.id, "school": e.school, "email": e.email} for e in emails]
+    return [dict(entry) for entry in directory.snapshot().entries]
+
+def search_emails(text):
+    return directory.search(text)
+
+def directory_generation():
+    return directory.generation()
 
 def add_email(school, email):
     try:
         new_email = EmailDirectory(school=school, email=email)
         db.session.add(new_email)
         db.session.commit()
+        directory.invalidate()
         return new_email.id
     except Exception as e:
         db.session.rollback()
@@ -22,6 +183,7 @@ def update_email(id, school, email):
             email_entry.school = school
             email_entry.email = email
             db.session.commit()
+            directory.invalidate()
             return True
         return False
     except Exception as e:
@@ -34,6 +196,7 @@ def delete_email(id):
         if email_entry:
             db.session.delete(email_entry)
             db.session.commit()
+            directory.invalidate()
             return True
         return False
     except Exception as e:
@@ -0,0 +1,337 @@
+import contextlib
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+from database.content_watch import file_stamp
+from database.persistence import write_json_atomic, dumps_compact, file_mode
+
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+
+# Number of journal entries after which the journal is folded into the base file
+COMPACT_THRESHOLD = 200
+
+
+def journal_path(path):
+    """Path of the journal kept next to a JSON data file."""
+    return path + JOURNAL_SUFFIX
+
+
+def _resolve(data, path, create=False):
+    node = data
+    for key in path:
+        if create and isinstance(node, dict) and key not in node:
+            node[key] = []
+        node = node[key]
+    return node
+
+
+def _find_by_id(records, record_id, locate=None):
+    if locate is not None:
+        # Trust a caller's index only if it still points at the right record
+        i = locate(records, record_id)
+        if i is not None and 0 <= i < len(records) and str(records[i].get("id", "")) == str(record_id):
+            return i
+    for i, record in enumerate(records):
+        if str(record.get("id", "")) == str(record_id):
+            return i
+    raise KeyError(f"No record with id {record_id}")
+
+
+def apply_op(data, op, locate=None):
+    """
+    Apply one journal entry to data in place and return the new root.
+
+    Supported entries ("path" is a list of dict keys / list indexes from the root):
+        {"op": "append", "path": p, "value": v}     append v to the list at p (created in a dict if missing)
+        {"op": "set", "path": p, "value": v}        set the item at p to v
+        {"op": "update", "path": p, "value": v}     merge the fields of v into the dict at p
+        {"op": "delete", "path": p}                 delete the item at p
+        {"op": "update_id", "path": p, "id": i, "value": v}   merge v into the record with id i in the list at p
+        {"op": "replace_id", "path": p, "id": i, "value": v}  replace the record with id i in the list at p by v
+        {"op": "delete_id", "path": p, "id": i}     delete the record with id i from the list at p
+    locate(records, id), if given, returns the likely index of a record (or None), so
+    the *_id entries can skip the linear scan; a wrong guess falls back to the scan.
+    Raises KeyError, IndexError or TypeError if the entry does not apply.
+    """
+    kind = op.get("op")
+    path = op.get("path", [])
+    if kind == "append":
+        _resolve(data, path, create=True).append(op["value"])
+    elif kind == "set":
+        if not path:
+            return op["value"]
+        _resolve(data, path[:-1])[path[-1]] = op["value"]
+    elif kind == "update":
+        _resolve(data, path).update(op["value"])
+    elif kind == "delete":
+        del _resolve(data, path[:-1])[path[-1]]
+    elif kind == "update_id":
+        records = _resolve(data, path)
+        records[_find_by_id(records, op["id"], locate)].update(op["value"])
+    elif kind == "replace_id":
+        records = _resolve(data, path)
+        records[_find_by_id(records, op["id"], locate)] = op["value"]
+    elif kind == "delete_id":
+        records = _resolve(data, path)
+        del records[_find_by_id(records, op["id"], locate)]
+    else:
+        raise KeyError(f"Unknown journal op {kind!r}")
+    return data
+
+
+class JournaledDocument:
+    """
+    A JSON data file plus an append-only journal of mutations next to it.
+
+    Each admin edit appends one small JSON line to <file>.journal instead of
+    rewriting the whole file. The document is the base file with the journal
+    replayed on top; once the journal grows past compact_threshold entries it
+    is folded back into the base file. That is the only time an edit rewrites
+    the base file: nothing is compacted at exit.
+
+    The first journal line records the hash of the base file it applies to,
+    which makes compaction crash-safe: if the process dies after rewriting the
+    base file but before starting a new journal, the old journal no longer
+    matches the base and is ignored instead of being replayed twice.
+
+    Other workers tail the journal from their last offset (refresh()), so they
+    pick up edits by reading only the new lines. Writers hold an flock on
+    <file>.lock so appends and compactions from different workers never interleave.
+    """
+
+    def __init__(self, path, default, compact_threshold=COMPACT_THRESHOLD):
+        self.path = path
+        self.journal_path = journal_path(path)
+        self.default = default
+        self.compact_threshold = compact_threshold
+        self.lock = threading.RLock()
+        self.version = 0
+        self._data = None
+        self._base_hash = None
+        self._base_stamp = None
+        self._journal_stamp = None
+        self._offset = 0
+        self._entries = 0
+        self._journal_valid = False
+
+    # Reading
+
+    def _load(self):
+        """Read the base file and replay the journal from scratch."""
+        self._base_stamp = file_stamp(self.path)
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            data = json.loads(raw.decode("utf-8"))
+        except FileNotFoundError:
+            raw = b""
+            data = copy.deepcopy(self.default)
+        except ValueError as e:
+            logging.error(f"Invalid JSON in {self.path}: {e}")
+            raw = b""
+            data = copy.deepcopy(self.default)
+        self._base_hash = hashlib.sha1(raw).hexdigest()
+        self._data = data
+        self._offset = 0
+        self._entries = 0
+        self._journal_valid = False
+        self._journal_stamp = file_stamp(self.journal_path)
+        if self._journal_stamp is not None:
+            self._read_journal()
+        self.version += 1
+
+    def _read_journal(self):
+        """Apply the complete journal lines after the current offset. Returns the applied entries."""
+        applied = []
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return applied
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            # Only a partially written line so far
+            return applied
+        for line in chunk[:end].split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line.decode("utf-8"))
+            except ValueError:
+                logging.warning(f"Skipping corrupt line in {self.journal_path}")
+                continue
+            if self._offset == 0 and not self._journal_valid and "base" in entry:
+                self._journal_valid = entry["base"] == self._base_hash
+                if not self._journal_valid:
+                    logging.info(f"{self.journal_path} was already compacted into {self.path}, ignoring it")
+                continue
+            if not self._journal_valid:
+                continue
+            try:
+                self._data = apply_op(self._data, entry)
+            except (KeyError, IndexError, TypeError) as e:
+                logging.warning(f"Skipping journal entry {entry.get('op')} in {self.journal_path}: {e}")
+                continue
+            self._entries += 1
+            applied.append(entry)
+        self._offset += end + 1
+        return applied
+
+    def refresh(self):
+        """
+        Catch up with changes made by other processes.
+        Tails the journal when only new lines were appended and reloads
+        everything when the base file was rewritten or the journal replaced.
+
+        Returns:
+            bool: True if the document changed.
+        """
+        with self.lock:
+            if self._data is None:
+                self._load()
+                return True
+            journal_stamp = file_stamp(self.journal_path)
+            if file_stamp(self.path) != self._base_stamp:
+                self._load()
+                return True
+            if journal_stamp == self._journal_stamp:
+                return False
+            if (journal_stamp is None or self._journal_stamp is None
+                    or journal_stamp[2] != self._journal_stamp[2] or journal_stamp[1] < self._offset):
+                self._load()
+                return True
+            self._journal_stamp = journal_stamp
+            if self._read_journal():
+                self.version += 1
+                return True
+            return False
+
+    def stamp(self):
+        """Change stamp of the base file and its journal, used by the chatbot's content watcher."""
+        return (file_stamp(self.path), file_stamp(self.journal_path))
+
+    def view(self):
+        """
+        Return the live, up-to-date data. Hold self.lock while using it and never mutate it.
+        """
+        with self.lock:
+            self.refresh()
+            return self._data
+
+    def snapshot(self):
+        """Return an up-to-date copy of the data that the caller may modify freely."""
+        with self.lock:
+            return copy.deepcopy(self.view())
+
+    # Writing
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + LOCK_SUFFIX, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _write_journal_header(self):
+        """Atomically start a fresh journal for the current base file."""
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=JOURNAL_SUFFIX, dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write((dumps_compact({"base": self._base_hash}) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        # A new journal gets the permissions of its data file
+        os.chmod(tmp_path, file_mode(self.journal_path if os.path.exists(self.journal_path) else self.path))
+        os.replace(tmp_path, self.journal_path)
+        self._journal_valid = True
+        self._entries = 0
+        self._journal_stamp = file_stamp(self.journal_path)
+        self._offset = self._journal_stamp[1]
+
+    def _append(self, op):
+        if not self._journal_valid:
+            self._write_journal_header()
+        line = (dumps_compact(op) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            if f.tell() > self._offset:
+                # Terminate a partial line left by a crashed writer
+                line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_stamp = file_stamp(self.journal_path)
+        self._offset = self._journal_stamp[1]
+        self._entries += 1
+
+    def apply(self, op, locate=None):
+        """
+        Apply a mutation (see apply_op, which also takes locate) and append it to the journal.
+        Raises KeyError/IndexError/TypeError without journaling anything if it does not apply.
+        """
+        with self.lock, self._file_lock():
+            self.refresh()
+            # apply_op only mutates once every lookup succeeded, so a rejected op changes nothing
+            self._data = apply_op(self._data, op, locate)
+            try:
+                self._append(op)
+            except Exception:
+                # Journal write failed: drop the in-memory change
+                self._load()
+                raise
+            self.version += 1
+            if self._entries >= self.compact_threshold:
+                self._compact_locked()
+
+    def replace(self, data):
+        """Replace the whole document, writing it straight to the base file."""
+        with self.lock, self._file_lock():
+            self.refresh()
+            self._data = copy.deepcopy(data)
+            self._compact_locked()
+            self.version += 1
+
+    def compact(self):
+        """Fold the journal into the base file."""
+        with self.lock, self._file_lock():
+            self.refresh()
+            if self._entries or not self._journal_valid and self._journal_stamp is not None:
+                self._compact_locked()
+
+    def _compact_locked(self):
+        write_json_atomic(self.path, self._data)
+        with open(self.path, "rb") as f:
+            self._base_hash = hashlib.sha1(f.read()).hexdigest()
+        self._base_stamp = file_stamp(self.path)
+        self._write_journal_header()
+
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+def get_document(path, default):
+    """Return the process-wide JournaledDocument for a data file."""
+    key = os.path.normcase(os.path.abspath(path))
+    with _documents_lock:
+        document = _documents.get(key)
+        if document is None:
+            document = _documents[key] = JournaledDocument(path, default)
+        return document
+
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import stat
+import tempfile
+
+# Process umask, read once at import: os.umask can only be read by changing it, which is not thread-safe
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def dumps_compact(data):
+    """Serialize data as compact JSON (no indentation or spaces after separators)."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def file_mode(path):
+    """
+    Permission bits for a file about to replace path: those of the current
+    file, or what open() gives a new file (0o666 less the umask).
+    mkstemp creates its files with mode 0600, which os.replace would keep.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+# Writes are not coalesced: admin edits append to a journal (database/journal.py) and whole files
+# are only rewritten when a journal is compacted, so there are no bursts of full writes to merge.
+def write_json_atomic(path, data):
+    """
+    Write data to path as compact JSON without ever exposing a partial file.
+
+    The payload goes to a temporary file in the same directory, is fsynced, and
+    then renamed over the target, so readers in other workers see either the
+    old or the new file, never a truncated one.
+    """
+    payload = dumps_compact(data)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, file_mode(path))
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def read_json(path, default=None):
+    """
+    Read a JSON file.
+    Returns default if the file is missing or invalid.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logging.error(f"Invalid JSON in {path}: {e}")
+        return default
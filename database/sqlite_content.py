@@ -0,0 +1,339 @@
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+from uuid import uuid4
+
+# Content kinds stored as {category: [rule, ...]} documents
+RULE_KINDS = ("user_rules", "guest_rules")
+# Content kinds stored as [record, ...] documents
+RECORD_KINDS = ("faqs", "locations", "visuals")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content_versions (
+    kind TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS content_categories (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+CREATE TABLE IF NOT EXISTS content_items (
+    rowid INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL,
+    id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_content_items_kind_position ON content_items (kind, category, position);
+CREATE INDEX IF NOT EXISTS ix_content_items_kind_id ON content_items (kind, id);
+-- Dropped from databases created with the earlier full-text question index
+DROP TRIGGER IF EXISTS content_items_ai;
+DROP TRIGGER IF EXISTS content_items_ad;
+DROP TRIGGER IF EXISTS content_items_au;
+DROP TABLE IF EXISTS content_fts;
+"""
+
+
+class ContentDatabase:
+    """
+    SQLite database holding rules, FAQs, locations and visuals as rows.
+
+    Each rule or record is one row of content_items (its JSON in data), so an
+    admin edit touches a single row. content_versions holds a counter per kind
+    that every write bumps, which is how other workers notice changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection().executescript(SCHEMA)
+
+    def connection(self):
+        """Return this thread's connection (sqlite3 connections are not shared between threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def version(self, kind):
+        row = self.connection().execute("SELECT version FROM content_versions WHERE kind = ?", (kind,)).fetchone()
+        return row[0] if row else 0
+
+    def write(self, kind, work):
+        """Run work(conn) in one write transaction and bump the version of kind."""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+            conn.execute(
+                "INSERT INTO content_versions (kind, version) VALUES (?, 1) "
+                "ON CONFLICT (kind) DO UPDATE SET version = version + 1",
+                (kind,),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+
+class SqliteDocument:
+    """
+    One kind of content in the ContentDatabase, with the same interface as
+    journal.JournaledDocument (view/snapshot/refresh/apply/replace/stamp), so
+    RuleStore, the admin routes and the chatbot work unchanged on either backend.
+
+    Journal ops are translated to row-level statements. The materialized data
+    returned by view() is rebuilt only when the kind's version changed.
+    """
+
+    def __init__(self, database, kind):
+        if kind not in RULE_KINDS and kind not in RECORD_KINDS:
+            raise ValueError(f"Unknown content kind {kind!r}")
+        self.database = database
+        self.kind = kind
+        self.path = database.path
+        self.lock = threading.RLock()
+        self.version = None
+        self._data = None
+
+    # Reading
+
+    def _load(self, version):
+        conn = self.database.connection()
+        rows = conn.execute(
+            "SELECT category, data FROM content_items WHERE kind = ? ORDER BY category, position",
+            (self.kind,),
+        ).fetchall()
+        if self.kind in RULE_KINDS:
+            data = {}
+            for (name,) in conn.execute(
+                    "SELECT name FROM content_categories WHERE kind = ? ORDER BY position", (self.kind,)):
+                data[name] = []
+            for category, item in rows:
+                data.setdefault(category, []).append(json.loads(item))
+        else:
+            data = [json.loads(item) for _category, item in rows]
+        self._data = data
+        self.version = version
+
+    def refresh(self):
+        """Reload the rows if this kind changed. Returns True if the document changed."""
+        with self.lock:
+            version = self.database.version(self.kind)
+            if version == self.version:
+                return False
+            self._load(version)
+            return True
+
+    def stamp(self):
+        """Change stamp used by the chatbot's content watcher."""
+        return self.database.version(self.kind)
+
+    def view(self):
+        """Return the live, up-to-date data. Hold self.lock while using it and never mutate it."""
+        with self.lock:
+            self.refresh()
+            return self._data
+
+    def snapshot(self):
+        """Return an up-to-date copy of the data that the caller may modify freely."""
+        with self.lock:
+            return copy.deepcopy(self.view())
+
+    # Writing
+
+    def _insert(self, conn, category, item):
+        if self.kind in RULE_KINDS:
+            conn.execute(
+                "INSERT OR IGNORE INTO content_categories (kind, name, position) "
+                "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM content_categories WHERE kind = ?))",
+                (self.kind, category, self.kind),
+            )
+            if not item.get("id"):
+                item = dict(item, id=str(uuid4()))
+        conn.execute(
+            "INSERT INTO content_items (kind, category, position, id, data) VALUES "
+            "(?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM content_items WHERE kind = ? AND category = ?), ?, ?)",
+            (self.kind, category, self.kind, category,
+             str(item["id"]) if item.get("id") is not None else None,
+             json.dumps(item, ensure_ascii=False)),
+        )
+
+    def _row_by_id(self, conn, category, item_id):
+        row = conn.execute(
+            "SELECT rowid, data FROM content_items WHERE kind = ? AND category = ? AND id = ? LIMIT 1",
+            (self.kind, category, str(item_id)),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"No record with id {item_id}")
+        return row
+
+    def _row_at(self, conn, index):
+        if not isinstance(index, int) or index < 0:
+            raise IndexError(f"Invalid position {index!r}")
+        row = conn.execute(
+            "SELECT rowid, data FROM content_items WHERE kind = ? ORDER BY position LIMIT 1 OFFSET ?",
+            (self.kind, index),
+        ).fetchone()
+        if row is None:
+            raise IndexError(f"Position {index} out of range")
+        return row
+
+    def _update(self, conn, rowid, item):
+        conn.execute(
+            "UPDATE content_items SET id = ?, data = ? WHERE rowid = ?",
+            (str(item["id"]) if item.get("id") is not None else None,
+             json.dumps(item, ensure_ascii=False), rowid),
+        )
+
+    def _apply_rows(self, conn, op):
+        kind = op.get("op")
+        path = list(op.get("path", []))
+        if self.kind in RULE_KINDS:
+            # Rules: path is [category]
+            if len(path) != 1:
+                raise KeyError(f"Unsupported path {path!r} for {self.kind}")
+            category = path[0]
+            if kind == "append":
+                self._insert(conn, category, op["value"])
+            elif kind == "set":
+                self._delete_category(conn, category)
+                conn.execute(
+                    "INSERT INTO content_categories (kind, name, position) "
+                    "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM content_categories WHERE kind = ?))",
+                    (self.kind, category, self.kind),
+                )
+                for item in op["value"]:
+                    self._insert(conn, category, item)
+            elif kind == "delete":
+                if not self._delete_category(conn, category):
+                    raise KeyError(category)
+            elif kind in ("update_id", "replace_id"):
+                rowid, data = self._row_by_id(conn, category, op["id"])
+                item = dict(json.loads(data), **op["value"]) if kind == "update_id" else op["value"]
+                self._update(conn, rowid, item)
+            elif kind == "delete_id":
+                rowid, _data = self._row_by_id(conn, category, op["id"])
+                conn.execute("DELETE FROM content_items WHERE rowid = ?", (rowid,))
+            else:
+                raise KeyError(f"Unsupported op {kind!r} for {self.kind}")
+            return
+
+        # Records: path is [] or [index]
+        if kind == "append" and not path:
+            self._insert(conn, "", op["value"])
+        elif kind == "set" and not path:
+            self._replace_rows(conn, op["value"])
+        elif kind in ("set", "update", "delete") and len(path) == 1:
+            rowid, data = self._row_at(conn, path[0])
+            if kind == "delete":
+                conn.execute("DELETE FROM content_items WHERE rowid = ?", (rowid,))
+            else:
+                self._update(conn, rowid, dict(json.loads(data), **op["value"]) if kind == "update" else op["value"])
+        elif kind in ("update_id", "replace_id", "delete_id") and not path:
+            rowid, data = self._row_by_id(conn, "", op["id"])
+            if kind == "delete_id":
+                conn.execute("DELETE FROM content_items WHERE rowid = ?", (rowid,))
+            else:
+                self._update(conn, rowid, dict(json.loads(data), **op["value"]) if kind == "update_id" else op["value"])
+        else:
+            raise KeyError(f"Unsupported op {kind!r} at {path!r} for {self.kind}")
+
+    def _delete_category(self, conn, category):
+        conn.execute("DELETE FROM content_items WHERE kind = ? AND category = ?", (self.kind, category))
+        return conn.execute(
+            "DELETE FROM content_categories WHERE kind = ? AND name = ?", (self.kind, category)
+        ).rowcount > 0
+
+    def _replace_rows(self, conn, data):
+        conn.execute("DELETE FROM content_items WHERE kind = ?", (self.kind,))
+        conn.execute("DELETE FROM content_categories WHERE kind = ?", (self.kind,))
+        if self.kind in RULE_KINDS:
+            for position, (category, items) in enumerate(data.items()):
+                conn.execute(
+                    "INSERT INTO content_categories (kind, name, position) VALUES (?, ?, ?)",
+                    (self.kind, category, position),
+                )
+                for item in items:
+                    self._insert(conn, category, item)
+        else:
+            for item in data:
+                self._insert(conn, "", item)
+
+    def apply(self, op, locate=None):
+        """
+        Apply a journal-style mutation (see journal.apply_op) as row-level statements.
+        locate is accepted for interface parity and ignored: rows are looked up by id in SQL.
+        Raises KeyError/IndexError if it does not apply; nothing is written in that case.
+        """
+        with self.lock:
+            self.database.write(self.kind, lambda conn: self._apply_rows(conn, op))
+
+    def replace(self, data):
+        """Replace the whole document in one transaction."""
+        with self.lock:
+            self.database.write(self.kind, lambda conn: self._replace_rows(conn, data))
+
+    def compact(self):
+        """Nothing to fold: every write already lands in its row."""
+
+
+_databases = {}
+_documents = {}
+_registry_lock = threading.Lock()
+
+
+def get_database(path):
+    key = os.path.normcase(os.path.abspath(path))
+    with _registry_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = ContentDatabase(path)
+        return database
+
+
+def get_document(path, kind):
+    """Return the process-wide SqliteDocument for one kind of content in the database at path."""
+    database = get_database(path)
+    key = (os.path.normcase(os.path.abspath(path)), kind)
+    with _registry_lock:
+        document = _documents.get(key)
+        if document is None:
+            document = _documents[key] = SqliteDocument(database, kind)
+        return document
+
+
+def import_json(path, sources, force=False):
+    """
+    Import JSON content into the database at path.
+
+    Args:
+        path (str): SQLite database file.
+        sources (dict): Mapping of kind to the JSON document (journal.JournaledDocument) to copy.
+        force (bool): Re-import kinds that were already imported.
+
+    Returns:
+        list: The kinds that were imported.
+    """
+    database = get_database(path)
+    imported = []
+    for kind, source in sources.items():
+        if not force and database.version(kind):
+            continue
+        data = source.snapshot()
+        get_document(path, kind).replace(data)
+        logging.info(f"Imported {kind} into {path}")
+        imported.append(kind)
+    return imported
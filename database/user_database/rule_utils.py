@@ -1,8 +1,10 @@
-import json
 import os
 import logging
+import threading
 from uuid import uuid4
 
+from database import content_store
+
 # Main combined files paths
 USER_COMBINED_FILE = os.path.join(os.path.dirname(__file__), "all_user_rules.json")
 GUEST_COMBINED_FILE = os.path.join(os.path.dirname(__file__), "..", "guest_database", "all_guest_rules.json")
@@ -38,22 +40,179 @@ CATEGORY_FILES = {
     }
 }
 
+def _content_kind(file_path):
+    """Content kind of a combined rules file for the content backend, or None for other files."""
+    path = os.path.normcase(os.path.abspath(file_path))
+    if path == os.path.normcase(os.path.abspath(USER_COMBINED_FILE)):
+        return "user_rules"
+    if path == os.path.normcase(os.path.abspath(GUEST_COMBINED_FILE)):
+        return "guest_rules"
+    return None
+
+class RuleStore:
+    """
+    In-memory owner of one combined rules file, kept in a content document.
+
+    The file is parsed once and kept in memory together with an id -> (category,
+    position) index, so mutations are located without re-reading or scanning the
+    file; the store's own writes patch that index rather than rebuilding it. Each mutation
+    appends one line to the file's journal instead of rewriting the whole file
+    (or updates one row with the sqlite content backend); edits made by other
+    processes are picked up by tailing that journal.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.document = content_store.get_document(
+            file_path, {category: [] for category in CATEGORIES}, kind=_content_kind(file_path))
+        self._by_id = {}
+        self._positions = {}
+        self._indexed_version = None
+
+    def _view(self):
+        """Return the live data (caller holds the document lock), re-indexing it if it changed."""
+        data = self.document.view()
+        if self.document.version != self._indexed_version:
+            self._reindex(data)
+        return data
+
+    def _reindex(self, data):
+        self._by_id = {}
+        self._positions = {}
+        if isinstance(data, dict):
+            for category, rules in data.items():
+                for i, rule in enumerate(rules):
+                    if rule.get("id"):
+                        self._by_id[str(rule["id"])] = category
+                        self._positions[str(rule["id"])] = i
+        self._indexed_version = self.document.version
+
+    def _locate(self, records, rule_id):
+        return self._positions.get(str(rule_id))
+
+    def _apply(self, op, update_index):
+        """
+        Apply op, then patch the id index with update_index(data) instead of re-indexing.
+        If another process changed the file in between, the index is left stale and the
+        next _view rebuilds it.
+        """
+        with self.document.lock:
+            self._view()
+            version = self.document.version
+            try:
+                self.document.apply(op, locate=self._locate)
+            except (KeyError, IndexError, TypeError) as e:
+                logging.warning(f"Rejected change to {self.file_path}: {e}")
+                return False
+            data = self.document.view()
+            if self.document.version == version + 1:
+                update_index(data)
+                self._indexed_version = self.document.version
+            return True
+
+    def snapshot(self):
+        """Return a copy of the file contents that the caller may modify freely."""
+        with self.document.lock:
+            data = self._view()
+            if isinstance(data, dict):
+                return {category: [dict(rule) for rule in rules] for category, rules in data.items()}
+            return [dict(rule) for rule in data]
+
+    def replace(self, data):
+        """Replace the whole contents (e.g. after adding missing ids), rewriting the base file."""
+        self.document.replace(data)
+
+    def categories(self):
+        with self.document.lock:
+            return list(self._view().keys())
+
+    def add_rule(self, category, rule):
+        def update_index(data):
+            if rule.get("id"):
+                self._by_id[str(rule["id"])] = category
+                self._positions[str(rule["id"])] = len(data[category]) - 1
+        return self._apply({"op": "append", "path": [category], "value": rule}, update_index)
+
+    def edit_rule(self, rule_id, question, answer):
+        with self.document.lock:
+            category = self.find_category(rule_id)
+            if category is None:
+                return False
+            return self._apply({"op": "update_id", "path": [category], "id": str(rule_id),
+                                "value": {"question": question, "answer": answer}}, lambda data: None)
+
+    def delete_rule(self, rule_id):
+        rule_id = str(rule_id)
+        with self.document.lock:
+            category = self.find_category(rule_id)
+            if category is None:
+                return False
+            position = self._positions[rule_id]
+
+            def update_index(data):
+                del self._by_id[rule_id]
+                del self._positions[rule_id]
+                # Rules after the deleted one moved up by one
+                for rule in data[category][position:]:
+                    if rule.get("id"):
+                        self._positions[str(rule["id"])] -= 1
+            return self._apply({"op": "delete_id", "path": [category], "id": rule_id}, update_index)
+
+    def find_category(self, rule_id):
+        """Return the category holding rule_id, or None."""
+        with self.document.lock:
+            self._view()
+            return self._by_id.get(str(rule_id))
+
+    def add_category(self, category):
+        with self.document.lock:
+            if category in self._view():
+                return False
+            return self._apply({"op": "set", "path": [category], "value": []}, lambda data: None)
+
+    def remove_category(self, category):
+        with self.document.lock:
+            if category not in self._view():
+                return False
+
+            def update_index(data):
+                for rule_id in [i for i, c in self._by_id.items() if c == category]:
+                    del self._by_id[rule_id]
+                    del self._positions[rule_id]
+            return self._apply({"op": "delete", "path": [category]}, update_index)
+
+    def compact(self):
+        """Fold the journal into the base file now."""
+        self.document.compact()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(file_path):
+    """Return the process-wide RuleStore for a combined rules file."""
+    key = os.path.normcase(os.path.abspath(file_path))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = RuleStore(file_path)
+        return store
+
 def load_combined_file(file_path):
-    """Load the combined rules file"""
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Initialize with empty categories if file doesn't exist
-        return {category: [] for category in CATEGORIES}
+    """Load the combined rules file (served from memory; returns a copy)"""
+    return get_store(file_path).snapshot()
 
 def save_combined_file(file_path, data):
-    """Save data to the combined rules file"""
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        logging.error(f"Error saving rules to {file_path}: {e}")
+    """Save data to the combined rules file (written atomically, resetting its journal)"""
+    get_store(file_path).replace(data)
+
+def _user_type_files(user_type):
+    files = []
+    if user_type == "user" or user_type == "both":
+        files.append(USER_COMBINED_FILE)
+    if user_type == "guest" or user_type == "both":
+        files.append(GUEST_COMBINED_FILE)
+    return files
 
 def add_rule(user_type, category, question, response):
     """
@@ -66,92 +225,40 @@ def add_rule(user_type, category, question, response):
     """
     rule_id = str(uuid4())
 
-    # Create rule object
-    rule = {
-        "question": question,
-        "answer": response,
-        "id": rule_id
-    }
-
-    # Handle user rules
-    if user_type == "user" or user_type == "both":
-        file_path = USER_COMBINED_FILE
-        data = load_combined_file(file_path)
-        if category in data:
-            data[category].append(rule)
-        else:
-            data[category] = [rule]
-        save_combined_file(file_path, data)
-
-    # Handle guest rules
-    if user_type == "guest" or user_type == "both":
-        file_path = GUEST_COMBINED_FILE
-        data = load_combined_file(file_path)
-        if category in data:
-            data[category].append(rule)
-        else:
-            data[category] = [rule]
-        save_combined_file(file_path, data)
+    for file_path in _user_type_files(user_type):
+        # Each file gets its own rule object
+        rule = {
+            "question": question,
+            "answer": response,
+            "id": rule_id
+        }
+        get_store(file_path).add_rule(category, rule)
 
     return rule_id
 
 def delete_rule(rule_id, user_type='user', category='SOICT'):
     """
-    Delete a rule from the appropriate combined file based on user_type and category.
+    Delete a rule from the appropriate combined file based on user_type.
     user_type: "user" or "guest"
-    category: one of the categories in CATEGORIES
+    category: kept for compatibility; the rule is located by its ID
     rule_id: the ID of the rule to delete
     Returns True if rule was deleted, False otherwise.
     """
-    # Load the appropriate file
-    if user_type == "user":
-        file_path = USER_COMBINED_FILE
-    else:
-        file_path = GUEST_COMBINED_FILE
-
-    data = load_combined_file(file_path)
-
-    # Find and remove the rule
-    if category in data:
-        original_length = len(data[category])
-        data[category] = [rule for rule in data[category] if str(rule.get("id", "")) != str(rule_id)]
-
-        if len(data[category]) < original_length:
-            # Save the updated file
-            save_combined_file(file_path, data)
-            return True
-
-    return False
+    file_path = USER_COMBINED_FILE if user_type == "user" else GUEST_COMBINED_FILE
+    return get_store(file_path).delete_rule(rule_id)
 
 def edit_rule(rule_id, question, response, user_type='user', category='SOICT'):
     """
-    Edit a rule in the appropriate combined file based on user_type and category.
+    Edit a rule in the appropriate combined file based on user_type.
     user_type: "user" or "guest"
-    category: one of the categories in CATEGORIES
+    category: kept for compatibility; the rule is located by its ID
     rule_id: the ID of the rule to edit
     question: new question
     response: new response
     Returns True if rule was edited, False otherwise.
     """
-    # Load the appropriate file
-    if user_type == "user":
-        file_path = USER_COMBINED_FILE
-    else:
-        file_path = GUEST_COMBINED_FILE
-
-    data = load_combined_file(file_path)
-
-    # Find and edit the rule
-    if category in data:
-        for rule in data[category]:
-            if str(rule.get("id", "")) == str(rule_id):
-                rule["question"] = question
-                rule["answer"] = response
-                # Save the updated file
-                save_combined_file(file_path, data)
-                return True
-
-    return False
+    file_path = USER_COMBINED_FILE if user_type == "user" else GUEST_COMBINED_FILE
+    return get_store(file_path).edit_rule(rule_id, question, response)
 
 def add_empty_category(category_name, user_type='both'):
     """
@@ -161,27 +268,9 @@ def add_empty_category(category_name, user_type='both'):
     Returns True if category was added, False otherwise.
     """
     added = False
-
-    # Handle user rules
-    if user_type == "user" or user_type == "both":
-        file_path = USER_COMBINED_FILE
-        data = load_combined_file(file_path)
-
-        if category_name not in data:
-            data[category_name] = []
-            save_combined_file(file_path, data)
+    for file_path in _user_type_files(user_type):
+        if get_store(file_path).add_category(category_name):
             added = True
-
-    # Handle guest rules
-    if user_type == "guest" or user_type == "both":
-        file_path = GUEST_COMBINED_FILE
-        data = load_combined_file(file_path)
-
-        if category_name not in data:
-            data[category_name] = []
-            save_combined_file(file_path, data)
-            added = True
-
     return added
 
 def remove_category(category_name, user_type='both'):
@@ -192,25 +281,7 @@ def remove_category(category_name, user_type='both'):
     Returns True if category was removed, False otherwise.
     """
     removed = False
-
-    # Handle user rules
-    if user_type == "user" or user_type == "both":
-        file_path = USER_COMBINED_FILE
-        data = load_combined_file(file_path)
-
-        if category_name in data:
-            del data[category_name]
-            save_combined_file(file_path, data)
-            removed = True
-
-    # Handle guest rules
-    if user_type == "guest" or user_type == "both":
-        file_path = GUEST_COMBINED_FILE
-        data = load_combined_file(file_path)
-
-        if category_name in data:
-            del data[category_name]
-            save_combined_file(file_path, data)
+    for file_path in _user_type_files(user_type):
+        if get_store(file_path).remove_category(category_name):
             removed = True
-
     return removed
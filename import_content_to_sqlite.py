@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Import rules, FAQs, locations and visuals from the JSON data files into the
+SQLite content database used when CONTENT_BACKEND=sqlite.
+
+Usage:
+    python import_content_to_sqlite.py [--force]
+
+The database path comes from CONTENT_DB_PATH (default instance/content.db).
+Kinds that were already imported are skipped unless --force is given.
+"""
+
+import sys
+
+from chatbot import CONTENT_FILES
+from database import content_store, journal, sqlite_content
+from database.user_database import rule_utils
+
+def import_content(force=False):
+    """Copy every content kind from its JSON file (and journal) into the content database."""
+    sources = {}
+    for kind, path in CONTENT_FILES.items():
+        default = {category: [] for category in rule_utils.CATEGORIES} if kind.endswith("_rules") else []
+        sources[kind] = journal.get_document(path, default)
+    imported = sqlite_content.import_json(content_store.CONTENT_DB_PATH, sources, force=force)
+    for kind in CONTENT_FILES:
+        status = "imported" if kind in imported else "already imported, skipped"
+        print(f"{kind}: {status}")
+
+if __name__ == '__main__':
+    import_content(force='--force' in sys.argv[1:])
@@ -0,0 +1,121 @@
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+# Upper bounds (seconds) of the latency histogram buckets: 10 us to 2.5 s
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# A metric reported by a collector at scrape time: type is 'gauge' or 'counter',
+# samples a list of (labels dict, value)
+MetricFamily = namedtuple('MetricFamily', ['name', 'type', 'documentation', 'samples'])
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class Histogram:
+    """
+    Latency histogram in the Prometheus style: per label set, a count of
+    observations in each bucket plus their sum and total count.
+
+    observe() is a bisect and a few additions under a lock, cheap enough to
+    call around every matching stage.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [counts per bucket (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """Record one observation; labelvalues are given in labelnames order."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        """Lines of the Prometheus text exposition format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labelvalues, list(counts), total) for labelvalues, (counts, total) in self._series.items())
+        for labelvalues, counts, total in series:
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(dict(labels, le=_format_value(bound)))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics of this process: histograms fed by the code as it runs, and
+    collectors called at scrape time for values that already exist elsewhere
+    (cache counters, corpus sizes, queue depths).
+
+    Every gunicorn worker has its own registry, so each scrape reports the
+    worker that served it.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Return the histogram called name, creating it on first use."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(name, documentation, labelnames, buckets)
+            return histogram
+
+    def register_collector(self, collector):
+        """Add a callable returning an iterable of MetricFamily, called on every scrape."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            histograms = list(self._histograms.values())
+            collectors = list(self._collectors)
+        lines = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        for collector in collectors:
+            for family in collector():
+                lines.append(f'# HELP {family.name} {family.documentation}')
+                lines.append(f'# TYPE {family.name} {family.type}')
+                for labels, value in family.samples:
+                    lines.append(f'{family.name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -34,6 +34,10 @@ class Admin(db.Model, UserMixin):
 
 class ChatMessage(db.Model):
     __tablename__ = 'chatmessages'  # Note: lowercase in MySQL
+    __table_args__ = (
+        # Serves per-user session lookups and summaries (see add_chatmessages_indexes.py for existing databases)
+        db.Index('ix_chatmessages_user_session_timestamp', 'user_id', 'session_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.String(11), nullable=False)  # Note: varchar in MySQL
     session_id = db.Column(db.String(36), nullable=False)
@@ -41,6 +45,23 @@ class ChatMessage(db.Model):
     message = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False)
 
+class ChatSession(db.Model):
+    # One row per chat session, kept up to date as messages are written (see record_chat_sessions
+    # in user_management.py; backfill_chat_sessions.py fills it for existing messages)
+    __tablename__ = 'chat_sessions'
+    __table_args__ = (
+        # Serves the newest-first session list and its keyset pagination
+        db.Index('ix_chat_sessions_user_started', 'user_id', 'started_at', 'id'),
+    )
+    # Session ids are generated by the browser, so they are only unique per user
+    user_id = db.Column(db.String(11), primary_key=True)
+    id = db.Column(db.String(36), primary_key=True)
+    user_role = db.Column(db.String(10), nullable=False, default='user', server_default='user')  # Decides the retention period
+    title = db.Column(db.Text, nullable=True)  # First user message of the session
+    started_at = db.Column(db.DateTime, nullable=False)
+    last_message_at = db.Column(db.DateTime, nullable=False)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+
 class EmailDirectory(db.Model):
     __tablename__ = 'email directory'  # Note: space in MySQL table name
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
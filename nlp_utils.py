@@ -1,8 +1,10 @@
+import math
 import nltk
+from collections import Counter
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import string
 
 # Download required NLTK data
@@ -21,39 +23,110 @@ try:
 except LookupError:
     nltk.download('stopwords', quiet=True)
 
+_stop_words = None
+
+def get_stop_words():
+    """Return the English stopword set, loading it once per process."""
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = set(stopwords.words('english'))
+    return _stop_words
+
 def preprocess_text(text):
     """Preprocess text by tokenizing, removing stopwords and punctuation."""
     tokens = word_tokenize(text.lower())
-    stop_words = set(stopwords.words('english'))
+    stop_words = get_stop_words()
     tokens = [word for word in tokens if word not in stop_words and word not in string.punctuation]
     return ' '.join(tokens)
 
-def semantic_similarity(query, corpus):
+class TfidfRetriever:
     """
-    Compute similarity between query and a list of corpus sentences using TF-IDF and cosine similarity.
-    Returns the most similar sentence and similarity score.
+    TF-IDF model fitted once over a fixed corpus.
+    The document matrix is kept in memory so a query only transforms the
+    incoming text and does a single sparse matrix-vector product.
+
+    Query words outside the corpus vocabulary have no column in the matrix,
+    but they still count towards the query's norm, weighted with the largest
+    IDF of the corpus (the weight of a word seen in a single document).
+    Otherwise a message sharing one word with an FAQ and adding several
+    unrelated ones would score as a near duplicate of it.
     """
-    if not corpus:
-        return None, 0.0
-    
-    # Preprocess query and corpus
-    processed_query = preprocess_text(query)
-    processed_corpus = [preprocess_text(doc) for doc in corpus]
-    
-    # Add query to corpus for vectorization
-    all_texts = [processed_query] + processed_corpus
-    
-    # Create TF-IDF vectors
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform(all_texts)
-    
-    # Compute cosine similarity between query and corpus
-    cosine_similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
-    
-    # Find the most similar document
-    if len(cosine_similarities) > 0:
-        max_idx = cosine_similarities.argmax()
-        max_score = cosine_similarities[max_idx]
-        return corpus[max_idx], float(max_score)
-    
-    return None, 0.0
+
+    def __init__(self, corpus):
+        self.corpus = list(corpus)
+        self.vectorizer = None
+        self.matrix = None
+        if not self.corpus:
+            return
+        processed_corpus = [preprocess_text(doc) for doc in self.corpus]
+        try:
+            self.vectorizer = TfidfVectorizer()
+            self.matrix = self.vectorizer.fit_transform(processed_corpus)
+        except ValueError:
+            # Empty vocabulary (e.g. every document is only stopwords)
+            self.vectorizer = None
+            self.matrix = None
+            return
+        self.analyzer = self.vectorizer.build_analyzer()
+        self.vocabulary = self.vectorizer.vocabulary_
+        self.idf = self.vectorizer.idf_
+        self.unknown_idf = float(self.idf.max())
+
+    def transform(self, texts):
+        """
+        TF-IDF rows of texts over the corpus vocabulary, L2-normalised over
+        all of their words, including the ones the corpus does not contain.
+        """
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            weights = {}
+            norm = 0.0
+            for term, count in Counter(self.analyzer(preprocess_text(text))).items():
+                column = self.vocabulary.get(term)
+                weight = count * (self.idf[column] if column is not None else self.unknown_idf)
+                norm += weight * weight
+                if column is not None:
+                    weights[column] = weight
+            norm = math.sqrt(norm)
+            for column, weight in weights.items():
+                rows.append(row)
+                columns.append(column)
+                values.append(weight / norm)
+        return csr_matrix((values, (rows, columns)), shape=(len(texts), len(self.vocabulary)))
+
+    def query(self, text):
+        """
+        Find the corpus entry most similar to text.
+        Returns (index, score), or (None, 0.0) when nothing overlaps.
+        """
+        if self.matrix is None:
+            return None, 0.0
+        query_vector = self.transform([text])
+        if query_vector.nnz == 0:
+            return None, 0.0
+        # Rows are L2-normalised, so the dot product is the cosine similarity
+        scores = (self.matrix @ query_vector.T).toarray().ravel()
+        best_index = int(scores.argmax())
+        return best_index, float(scores[best_index])
+
+    def query_many(self, texts, chunk_size=1000):
+        """
+        Find the most similar corpus entry for every text, like query() but with
+        one sparse matrix product per chunk of texts.
+        Returns a list of (index, score), (None, 0.0) for texts with no overlap.
+        """
+        texts = list(texts)
+        if self.matrix is None:
+            return [(None, 0.0)] * len(texts)
+        results = []
+        for start in range(0, len(texts), chunk_size):
+            query_matrix = self.transform(texts[start:start + chunk_size])
+            # (chunk x corpus) cosine similarities; each chunk's dense block stays small
+            scores = (query_matrix @ self.matrix.T).toarray()
+            best = scores.argmax(axis=1)
+            for row, best_index in enumerate(best):
+                if query_matrix.indptr[row] == query_matrix.indptr[row + 1]:
+                    results.append((None, 0.0))
+                else:
+                    results.append((int(best_index), float(scores[row, best_index])))
+        return results
@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import threading
+from collections import namedtuple
+
+from flask import current_app, request
+
+from database.content_watch import file_stamp
+from database.persistence import dumps_compact
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+# Serialized body of a JSON endpoint for one generation of its content.
+# variants maps a Content-Encoding ('br', 'gzip') to the precompressed body.
+CachedBody = namedtuple('CachedBody', ['generation', 'body', 'etag', 'variants'])
+
+
+def compress_variants(body):
+    """
+    Compress a body once with every available encoding (at the highest level,
+    since this only runs when content changes). Encodings that do not make
+    the body smaller are left out.
+    """
+    variants = {}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return variants
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    # mtime=0 keeps the output (and its ETag) identical across workers
+    variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+class JSONResponseCache:
+    """
+    In-process cache of serialized JSON endpoint bodies.
+
+    Each entry is keyed by endpoint and tagged with the generation of the
+    content it was built from (a document version or a file stamp). While the
+    generation is unchanged a request costs no disk read, no JSON parse,
+    no serialization and no compression: the minified body and its gzip
+    (and brotli, if installed) variants are produced once per generation.
+    The ETag is a hash of the body, so every worker hands out the same ETag
+    for the same content. Hits and misses (rebuilds) are counted for monitoring.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, generation, build):
+        """
+        Return the CachedBody for key, calling build() to produce the data
+        only when there is no entry for this generation yet.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.generation == generation:
+            self.hits += 1
+            return entry
+        body = dumps_compact(build()).encode('utf-8')
+        entry = CachedBody(generation, body, hashlib.sha1(body).hexdigest(), compress_variants(body))
+        with self._lock:
+            self._entries[key] = entry
+            self.misses += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+json_cache = JSONResponseCache()
+
+
+def document_generation(document):
+    """Generation of a content document (journaled file or sqlite kind), after catching up with other workers."""
+    with document.lock:
+        document.refresh()
+        return document.version
+
+
+def file_generation(path):
+    """Generation of a plain data file: its (mtime, size, inode) stamp."""
+    return file_stamp(path)
+
+
+def negotiate_encoding(variants):
+    """Pick the best precompressed variant the client accepts, or None for the plain body."""
+    accepted = request.accept_encodings
+    best = None
+    best_quality = 0
+    # Ties go to brotli, which compresses JSON better than gzip
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and accepted[encoding] > best_quality:
+            best = encoding
+            best_quality = accepted[encoding]
+    return best
+
+
+def cached_json_response(key, generation, build, max_age=0):
+    """
+    Serve a JSON body from json_cache with a strong ETag.
+
+    The precompressed variant matching Accept-Encoding is sent as is, each
+    variant with its own ETag. Answers If-None-Match revalidations with 304
+    Not Modified. With max_age=0 the response is marked no-cache, so browsers
+    always revalidate (cheap with the ETag) and pick up admin edits immediately.
+    """
+    entry = json_cache.get(key, generation, build)
+    encoding = negotiate_encoding(entry.variants)
+    if encoding is None:
+        response = current_app.response_class(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+    else:
+        response = current_app.response_class(entry.variants[encoding], mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{entry.etag}-{encoding}')
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
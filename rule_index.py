@@ -0,0 +1,327 @@
+import re
+from bisect import bisect_left
+from collections import namedtuple
+
+
+def simple_tokenize(text):
+    """
+    Simple tokenizer that converts text to lowercase and splits on non-alphanumeric characters, but keeps hyphens in words.
+    """
+    return re.findall(r'\b[\w-]+\b', text.lower())
+
+
+# Stopwords and punctuation stripped from the questions shown in the chat page's questions modal
+CATALOG_STOPWORDS = frozenset([
+    'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are',
+    'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'may', 'might', 'can', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him',
+    'her', 'us', 'them', 'my', 'your', 'his', 'its', 'our', 'their', 'this', 'that', 'these', 'those',
+])
+CATALOG_PUNCTUATION = re.compile(r"[.,/#!$%^&*;:{}=\-_`~()]")
+
+
+def catalog_preprocess(text):
+    """
+    Preprocess a question for the question catalog: lowercase, strip punctuation and common stopwords.
+    Same output as the preprocessText() function chat.js used to run in the browser.
+    """
+    words = CATALOG_PUNCTUATION.sub('', text.lower()).split(' ')
+    return ' '.join(word for word in words if word and word not in CATALOG_STOPWORDS)
+
+
+# Immutable, role-filtered view of the compiled rule indexes and FAQ model.
+# One snapshot is compiled per role whenever content changes and published by
+# swapping a single reference, so a request just picks its role's snapshot
+# instead of concatenating and filtering rule lists, and never observes a
+# half-applied admin edit.
+RuleSnapshot = namedtuple('RuleSnapshot', ['role', 'version', 'keyword_index', 'question_index', 'faqs', 'faq_retriever',
+                                           'suggest_index'])
+
+
+class QuestionIndex:
+    """
+    Inverted index over rule questions, built once when the rules are loaded.
+
+    Each question token points to the positions of the rules that contain it,
+    and every rule keeps the number of distinct tokens it requires. A message
+    only touches the rules sharing at least one token with it, and the
+    "all question tokens present" check becomes a counter comparison.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.postings = {}
+        self.required_counts = []
+        self.scores = []
+        for position, rule in enumerate(rules):
+            question_tokens = simple_tokenize(rule.get('question', ''))
+            distinct_tokens = set(question_tokens)
+            self.required_counts.append(len(distinct_tokens))
+            # Score matches the old behaviour: number of question tokens
+            self.scores.append(len(question_tokens))
+            for token in distinct_tokens:
+                self.postings.setdefault(token, []).append(position)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def best_match(self, tokens):
+        """
+        Return the rule whose question tokens are all present in tokens.
+        The rule with the most question tokens wins; ties go to the rule
+        loaded first. Returns (rule, score) or (None, 0).
+        """
+        counts = {}
+        for token in set(tokens):
+            for position in self.postings.get(token, ()):
+                counts[position] = counts.get(position, 0) + 1
+
+        best_position = None
+        best_score = 0
+        for position, count in counts.items():
+            if count != self.required_counts[position]:
+                continue
+            score = self.scores[position]
+            if score > best_score or (score == best_score and position < best_position):
+                best_score = score
+                best_position = position
+
+        if best_position is None:
+            return None, 0
+        return self.rules[best_position], best_score
+
+
+class KeywordSetIndex:
+    """
+    Inverted index over the keyword sets of location and visual rules.
+
+    Every keyword set gets an id; each keyword points to the ids of the sets
+    containing it. A set is satisfied when all of its distinct keywords occur
+    in the message, and the largest satisfied set wins, so a lookup only
+    touches the sets that share a keyword with the message.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.postings = {}
+        self.set_rules = []
+        self.required_counts = []
+        self.scores = []
+        for position, rule in enumerate(rules):
+            for keyword_set in self.keyword_sets(rule.get('keywords', [])):
+                set_id = len(self.set_rules)
+                distinct_keywords = set(keyword_set)
+                self.set_rules.append(position)
+                self.required_counts.append(len(distinct_keywords))
+                self.scores.append(len(keyword_set))
+                for keyword in distinct_keywords:
+                    self.postings.setdefault(keyword, []).append(set_id)
+
+    @staticmethod
+    def keyword_sets(keywords):
+        """
+        Split normalized rule keywords into keyword sets.
+        Nested lists are individual sets; a flat list (legacy format) is one set.
+        """
+        keyword_sets = [keyword_set for keyword_set in keywords if isinstance(keyword_set, list) and keyword_set]
+        flat_keywords = [keyword for keyword in keywords if not isinstance(keyword, list)]
+        if flat_keywords:
+            keyword_sets.append(flat_keywords)
+        return keyword_sets
+
+    def __len__(self):
+        return len(self.rules)
+
+    def best_match(self, tokens):
+        """
+        Return the rule owning the largest keyword set fully present in tokens.
+        Ties go to the rule (and set) loaded first. Returns (rule, score) or (None, 0).
+        """
+        counts = {}
+        for token in set(tokens):
+            for set_id in self.postings.get(token, ()):
+                counts[set_id] = counts.get(set_id, 0) + 1
+
+        best_set = None
+        best_score = 0
+        for set_id, count in counts.items():
+            if count != self.required_counts[set_id]:
+                continue
+            score = self.scores[set_id]
+            if score > best_score or (score == best_score and set_id < best_set):
+                best_score = score
+                best_set = set_id
+
+        if best_set is None:
+            return None, 0
+        return self.rules[self.set_rules[best_set]], best_score
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index for type-ahead suggestions.
+
+    Each suggestion is stored under its normalized text and, in a second
+    array, under every suffix starting at a word boundary, so typing the start
+    of the question or of any word in it finds it. A lookup is a bisect into
+    each sorted array followed by a scan of at most the requested number of
+    completions: whole-text matches first, then word matches, each alphabetical.
+    """
+
+    def __init__(self, suggestions):
+        # The texts the index was built from, so an unchanged list can reuse it
+        self.source = tuple(suggestions)
+        self.suggestions = []
+        ids = {}
+        start_entries = []
+        word_entries = []
+        for text in self.source:
+            key = self.normalize(text)
+            if not key or key in ids:
+                continue
+            suggestion_id = ids[key] = len(self.suggestions)
+            self.suggestions.append(text)
+            start_entries.append((key, suggestion_id))
+            words = key.split(' ')
+            for i in range(1, len(words)):
+                word_entries.append((' '.join(words[i:]), suggestion_id))
+        start_entries.sort()
+        word_entries.sort()
+        self.start_keys = [key for key, _ in start_entries]
+        self.start_ids = [suggestion_id for _, suggestion_id in start_entries]
+        self.word_keys = [key for key, _ in word_entries]
+        self.word_ids = [suggestion_id for _, suggestion_id in word_entries]
+
+    @staticmethod
+    def normalize(text):
+        """Lowercase and keep only words, separated by single spaces."""
+        return ' '.join(re.findall(r"[\w'-]+", text.lower()))
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def complete(self, prefix, limit=8):
+        """Return up to limit suggestions completing prefix."""
+        key = self.normalize(prefix)
+        if not key or limit <= 0:
+            return []
+        results = []
+        seen = set()
+        for keys, ids in ((self.start_keys, self.start_ids), (self.word_keys, self.word_ids)):
+            i = bisect_left(keys, key)
+            while i < len(keys) and keys[i].startswith(key) and len(results) < limit:
+                if ids[i] not in seen:
+                    seen.add(ids[i])
+                    results.append(self.suggestions[ids[i]])
+                i += 1
+        return results
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a set of phrases.
+
+    Phrases and text are reduced to their simple_tokenize tokens, each
+    surrounded by single spaces, so a phrase only matches whole words.
+    find() walks the text once, following failure links on mismatches, and
+    reports every phrase occurring in it, whatever the number of phrases.
+    """
+
+    def __init__(self, phrases):
+        """
+        Args:
+            phrases: Iterable of (phrase, value) pairs; several phrases may share a value.
+        """
+        # Node 0 is the root; each node has its transitions, failure link and output values
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for phrase, value in phrases:
+            key = self.normalize(phrase)
+            if key == ' ':
+                continue
+            node = 0
+            for char in key:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = self.goto[node][char] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                node = next_node
+            if value not in self.output[node]:
+                self.output[node] += (value,)
+
+        # Breadth-first, so the failure target of every node is finished before its children
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] += tuple(v for v in self.output[self.fail[child]] if v not in self.output[child])
+                queue.append(child)
+
+    @staticmethod
+    def normalize(text):
+        """Tokens of the text separated and surrounded by single spaces."""
+        return ' ' + ' '.join(simple_tokenize(text)) + ' '
+
+    def find(self, text):
+        """Return the values of every phrase occurring in text, in order of their first occurrence."""
+        found = []
+        seen = set()
+        node = 0
+        for char in self.normalize(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for value in self.output[node]:
+                if value not in seen:
+                    seen.add(value)
+                    found.append(value)
+        return found
+
+
+class MatchResult:
+    """
+    Outcome of matching one message (see Chatbot.match).
+
+    stage is the stage that answered: 'keyword' (location/visual keyword set),
+    'question' (question rule), 'email' (email directory), 'faq' (TF-IDF
+    similarity), or 'fallback' / 'empty' when nothing did. rule_id, category
+    and score describe the matched rule or FAQ ('faq-<position>'), timings maps
+    each stage that ran to its duration in seconds ('cache' for a cache hit).
+    response is the answer text, None for 'fallback' and 'empty'.
+
+    Results are shared with the answer cache, so treat them as read-only.
+    """
+
+    __slots__ = ('stage', 'rule_id', 'category', 'score', 'response', 'timings', 'cached')
+
+    def __init__(self, stage, rule_id=None, category=None, score=None, response=None, timings=None, cached=False):
+        self.stage = stage
+        self.rule_id = rule_id
+        self.category = category
+        self.score = score
+        self.response = response
+        self.timings = timings if timings is not None else {}
+        self.cached = cached
+
+    @property
+    def matched(self):
+        return self.response is not None
+
+    def replace(self, **changes):
+        """Return a copy with some fields changed."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return MatchResult(**fields)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"MatchResult(stage={self.stage!r}, rule_id={self.rule_id!r}, score={self.score!r}, cached={self.cached!r})"
@@ -1,13 +1,3 @@
-function preprocessText(text) {
-    // Simple preprocessing: lowercase, remove punctuation, remove common stopwords
-    const stopwords = ['a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'can', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'its', 'our', 'their', 'this', 'that', 'these', 'those'];
-    return text.toLowerCase()
-        .replace(/[.,\/#!$%\^&\*;:{}=\-_`~()]/g, '')
-        .split(' ')
-        .filter(word => word && !stopwords.includes(word))
-        .join(' ');
-}
-
 document.addEventListener('DOMContentLoaded', () => {
     // Generate or retrieve session_id
     let currentSessionId = sessionStorage.getItem('chat_session_id');
@@ -16,80 +6,14 @@ document.addEventListener('DOMContentLoaded', () => {
         sessionStorage.setItem('chat_session_id', currentSessionId);
     }
 
-    // Load categories and FAQs to categorize questions
-    let categories = [];
-    let faqs = [];
+    // Questions for the questions modal, grouped by category and already
+    // preprocessed by the server for this user's role
     let questionCategories = {};
 
-    // Fetch all rules and locations for categories
-    Promise.all([
-        fetch('/database/guest_database/all_guest_rules.json').then(r => r.json()),
-        fetch('/database/user_database/all_user_rules.json').then(r => r.json()),
-        fetch('/database/locations/locations.json').then(r => r.json()),
-        fetch('/database/faqs.json').then(r => r.json())
-    ])
-        .then(([guestRules, userRules, locations, faqsData]) => {
-            faqs = faqsData;
-            categories = Object.keys(guestRules); // ["SOICT", "SOIT", "SOBM", "Registrar", "Faculty", "SOED"]
-            categories.push("Locations", "Faculties"); // Add additional categories
-            // Initialize questionCategories with categories
-            categories.forEach(cat => {
-                questionCategories[cat] = [];
-            });
-            questionCategories["General"] = []; // Add General for uncategorized
-
-            // Add questions from guest rules
-            Object.keys(guestRules).forEach(cat => {
-                guestRules[cat].forEach(rule => {
-                    questionCategories[cat].push({
-                        original: rule.question,
-                        preprocessed: preprocessText(rule.question)
-                    });
-                });
-            });
-
-            // Add questions from user rules
-            Object.keys(userRules).forEach(cat => {
-                userRules[cat].forEach(rule => {
-                    questionCategories[cat].push({
-                        original: rule.question,
-                        preprocessed: preprocessText(rule.question)
-                    });
-                });
-            });
-
-            // Add location questions
-            locations.forEach(loc => {
-                loc.keywords.forEach(kw => {
-                    const displayText = "Where is " + kw.join(" ") + "?";
-                    questionCategories["Locations"].push({
-                        original: displayText,
-                        preprocessed: preprocessText(displayText)
-                    });
-                });
-            });
-
-            // Categorize FAQs based on keywords in questions
-            faqs.forEach(faq => {
-                const question = faq.question.toLowerCase();
-                let categorized = false;
-                categories.forEach(cat => {
-                    if (question.includes(cat.toLowerCase())) {
-                        questionCategories[cat].push({
-                            original: faq.question,
-                            preprocessed: preprocessText(faq.question)
-                        });
-                        categorized = true;
-                    }
-                });
-                if (!categorized) {
-                    questionCategories["General"].push({
-                        original: faq.question,
-                        preprocessed: preprocessText(faq.question)
-                    });
-                }
-            });
-
+    fetch('/question_catalog')
+        .then(r => r.json())
+        .then(catalog => {
+            questionCategories = catalog.categories || {};
             // Now initialize the modal after data is loaded
             initializeQuestionsModal();
         })
@@ -118,6 +42,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const sidebarMinimize = document.getElementById('sidebar-minimize');
     const historyList = document.getElementById('history-list');
 
+    // Sessions are fetched a page at a time; older pages load as the sidebar is scrolled
+    let sessionsCursor = null;
+    let sessionsLoading = false;
+
     // Load chat history if sidebar exists
     if (sidebar) {
         loadChatHistory();
@@ -136,22 +64,36 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    async function loadChatHistory() {
+    async function loadChatHistory(cursor = null) {
+        if (sessionsLoading) return;
+        sessionsLoading = true;
         try {
-            const response = await fetch('/get_chat_sessions_summary');
+            const url = cursor ? `/get_chat_sessions?cursor=${encodeURIComponent(cursor)}` : '/get_chat_sessions';
+            const response = await fetch(url);
             if (response.ok) {
-                const sessions = await response.json();
-                displaySessions(sessions);
+                const page = await response.json();
+                sessionsCursor = page.next_cursor;
+                displaySessions(page.sessions, cursor !== null);
             }
         } catch (error) {
             console.error('Error loading chat sessions:', error);
+        } finally {
+            sessionsLoading = false;
         }
     }
 
-    function displaySessions(sessions) {
+    if (historyList) {
+        historyList.addEventListener('scroll', () => {
+            if (sessionsCursor && historyList.scrollTop + historyList.clientHeight >= historyList.scrollHeight - 50) {
+                loadChatHistory(sessionsCursor);
+            }
+        });
+    }
+
+    function displaySessions(sessions, append = false) {
         if (!historyList) return;
 
-        historyList.innerHTML = '';
+        if (!append) historyList.innerHTML = '';
 
         sessions.forEach(session => {
             const sessionDiv = document.createElement('div');
@@ -205,6 +147,20 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+// Older messages of the open session are fetched a page at a time when scrolling to the top
+let messagesCursor = null;
+let messagesLoading = false;
+
+function createHistoryMessage(msg) {
+    const msgDiv = document.createElement('div');
+    msgDiv.classList.add('message', msg.sender === 'user' ? 'message-user' : 'message-bot');
+    msgDiv.innerHTML = `
+        <div class="message-content">${msg.message}</div>
+        <div class="message-time"><i class="fas fa-${msg.sender === 'user' ? 'user' : 'robot'} me-1"></i>${new Date(msg.timestamp).toLocaleTimeString()}</div>
+    `;
+    return msgDiv;
+}
+
 async function loadHistoryForSession(sessionId) {
     try {
         const response = await fetch(`/get_chat_session_history/${sessionId}`);
@@ -219,14 +175,9 @@ async function loadHistoryForSession(sessionId) {
             if (suggestionContainer) suggestionContainer.style.display = 'block';
             // Add messages
             sessionData.messages.forEach(msg => {
-                const msgDiv = document.createElement('div');
-                msgDiv.classList.add('message', msg.sender === 'user' ? 'message-user' : 'message-bot');
-                msgDiv.innerHTML = `
-                    <div class="message-content">${msg.message}</div>
-                    <div class="message-time"><i class="fas fa-${msg.sender === 'user' ? 'user' : 'robot'} me-1"></i>${new Date(msg.timestamp).toLocaleTimeString()}</div>
-                `;
-                chatMessages.appendChild(msgDiv);
+                chatMessages.appendChild(createHistoryMessage(msg));
             });
+            messagesCursor = sessionData.next_cursor;
             scrollToBottom();
             // Update currentSessionId to this session
             currentSessionId = sessionId;
@@ -237,6 +188,33 @@ async function loadHistoryForSession(sessionId) {
     }
 }
 
+async function loadOlderMessages() {
+    if (messagesLoading || !messagesCursor) return;
+    messagesLoading = true;
+    const sessionId = currentSessionId;
+    try {
+        const response = await fetch(`/get_chat_session_history/${sessionId}?cursor=${encodeURIComponent(messagesCursor)}`);
+        if (response.ok && sessionId === currentSessionId) {
+            const sessionData = await response.json();
+            // Prepend while keeping the visible messages where they are
+            const previousHeight = chatMessages.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            sessionData.messages.forEach(msg => fragment.appendChild(createHistoryMessage(msg)));
+            chatMessages.insertBefore(fragment, chatMessages.firstChild);
+            chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+            messagesCursor = sessionData.next_cursor;
+        }
+    } catch (error) {
+        console.error('Error loading older messages:', error);
+    } finally {
+        messagesLoading = false;
+    }
+}
+
+chatMessages.addEventListener('scroll', () => {
+    if (chatMessages.scrollTop < 50) loadOlderMessages();
+});
+
     // New Chat button click handler
     const newChatBtn = document.getElementById('new-chat-btn');
     if (newChatBtn) {
@@ -244,6 +222,7 @@ async function loadHistoryForSession(sessionId) {
             // Generate new session_id
             currentSessionId = crypto.randomUUID();
             sessionStorage.setItem('chat_session_id', currentSessionId);
+            messagesCursor = null;
             // Clear only message and typing indicator elements
             const elementsToRemove = chatMessages.querySelectorAll('.message, .typing-indicator');
             elementsToRemove.forEach(el => el.remove());
@@ -365,6 +344,41 @@ async function loadHistoryForSession(sessionId) {
         userInput.focus();
     });
 
+    // Type-ahead: offer completions from /suggest in a datalist under the input
+    if (userInput) {
+        const suggestList = document.createElement('datalist');
+        suggestList.id = 'user-input-suggestions';
+        document.body.appendChild(suggestList);
+        userInput.setAttribute('list', suggestList.id);
+
+        let suggestTimer = null;
+        let suggestRequest = 0;
+        userInput.addEventListener('input', () => {
+            clearTimeout(suggestTimer);
+            const query = userInput.value.trim();
+            if (query.length < 2) {
+                suggestList.innerHTML = '';
+                return;
+            }
+            suggestTimer = setTimeout(async () => {
+                const requestId = ++suggestRequest;
+                try {
+                    const response = await fetch(`/suggest?q=${encodeURIComponent(query)}`);
+                    if (!response.ok || requestId !== suggestRequest) return;
+                    const data = await response.json();
+                    suggestList.innerHTML = '';
+                    (data.suggestions || []).forEach(text => {
+                        const option = document.createElement('option');
+                        option.value = text;
+                        suggestList.appendChild(option);
+                    });
+                } catch (error) {
+                    console.error('Error loading suggestions:', error);
+                }
+            }, 150);
+        });
+    }
+
     suggestionButtons.forEach(button => {
         button.addEventListener('click', () => {
             sendMessage(button.textContent.trim());
@@ -0,0 +1,37 @@
+from chatbot import Chatbot
+
+chatbot = Chatbot()
+uncached = Chatbot(cache_size=0)
+
+
+def variants():
+    """FAQ questions in forms that tokenize alike for the rule stages but not for the FAQ stage."""
+    queries = []
+    for faq in chatbot.faqs[:10]:
+        question = faq['question'].rstrip('?')
+        queries += [question, f'  {question.upper()}  ', f"{question} but I can't", f'{question} but I can t']
+    return queries
+
+
+def answer(result):
+    # get_responses scores in a batched product, which may differ from match() in the last bit
+    score = round(result.score, 9) if result.score is not None else None
+    return result.stage, result.rule_id, score, result.response
+
+
+def test_cached_answers_equal_uncached_answers():
+    chatbot.answer_cache.clear()
+    for role in ('guest', 'user'):
+        for query in variants():
+            expected = answer(uncached.match(query, user_role=role))
+            assert answer(chatbot.match(query, user_role=role)) == expected, query
+            # Second time from the cache
+            assert answer(chatbot.match(query, user_role=role)) == expected, query
+
+
+def test_warmed_answers_equal_uncached_answers():
+    chatbot.answer_cache.clear()
+    queries = variants()
+    chatbot.get_responses(queries[::2], user_role='user', warm_cache=True)
+    for query in queries:
+        assert answer(chatbot.match(query, user_role='user')) == answer(uncached.match(query, user_role='user')), query
@@ -0,0 +1,74 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import chat_retention
+from chat_retention import ChatRetention, archive_file_name, read_archive
+from extensions import db
+from models import ChatMessage, ChatSession
+from user_management import message_columns, record_chat_sessions
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def no_pause(monkeypatch):
+    monkeypatch.setattr(chat_retention, 'CHUNK_PAUSE', 0)
+
+
+def seed_session(session_id, days_ago, messages=3, user_id='7', role='user'):
+    started = NOW - timedelta(days=days_ago)
+    rows = [{'user_id': user_id, 'session_id': session_id, 'Sender_type': 'user' if i % 2 == 0 else 'bot',
+             'message': f'{session_id} message {i}', 'timestamp': started + timedelta(minutes=i), 'user_role': role}
+            for i in range(messages)]
+    db.session.execute(ChatMessage.__table__.insert(), [message_columns(row) for row in rows])
+    record_chat_sessions(db, rows)
+    db.session.commit()
+    return started
+
+
+def remaining_sessions():
+    return sorted(chat_session.id for chat_session in ChatSession.query)
+
+
+def test_expired_sessions_are_archived_and_deleted(app, tmp_path):
+    old_started = seed_session('old-1', days_ago=60)
+    seed_session('old-2', days_ago=45, messages=2)
+    seed_session('recent', days_ago=5)
+    seed_session('admin-old', days_ago=60, role='admin')
+
+    retention = ChatRetention(app, db, str(tmp_path), {'user': 30})
+    assert retention.run(now=NOW) == {'sessions': 2, 'messages': 5}
+
+    assert remaining_sessions() == ['admin-old', 'recent']
+    assert ChatMessage.query.count() == 6
+    assert ChatMessage.query.filter(ChatMessage.session_id.in_(['old-1', 'old-2'])).count() == 0
+
+    archived = read_archive(os.path.join(str(tmp_path), archive_file_name(old_started)))
+    assert [record['session_id'] for record in archived] == ['old-1', 'old-2']
+    assert archived[0]['title'] == 'old-1 message 0'
+    assert [msg['message'] for msg in archived[0]['messages']] == [f'old-1 message {i}' for i in range(3)]
+
+    # Nothing left to archive
+    assert retention.run(now=NOW) == {'sessions': 0, 'messages': 0}
+
+
+def test_batches_are_limited(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_retention, 'ARCHIVE_BATCH_SESSIONS', 1)
+    for i in range(3):
+        seed_session(f'old-{i}', days_ago=60 - i)
+
+    retention = ChatRetention(app, db, str(tmp_path), {'user': 30})
+    assert retention.run(now=NOW, max_batches=2) == {'sessions': 2, 'messages': 6}
+    assert remaining_sessions() == ['old-2']
+
+
+def test_nothing_is_archived_without_a_retention_period(app, tmp_path):
+    seed_session('old', days_ago=400)
+    retention = ChatRetention(app, db, str(tmp_path), {'user': 0, 'admin': 0}, interval=60)
+    retention.start()
+    assert not retention._worker.running()
+    assert retention.run(now=NOW) == {'sessions': 0, 'messages': 0}
+    assert remaining_sessions() == ['old']
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.gz')]
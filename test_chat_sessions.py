@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import ChatMessage, ChatSession
+from user_management import UserManager, backfill_chat_sessions
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def manager(app):
+    return UserManager(db)
+
+
+def seed_legacy_history(user_id='7'):
+    """Messages written before chat_sessions existed: no session rows."""
+    messages = [
+        ('old-1', 'user', 'where is the library'),
+        ('old-1', 'bot', 'At the main building'),
+        ('old-1', 'user', 'thanks'),
+        ('old-2', 'bot', 'Hello!'),
+        ('old-2', 'user', 'office hours'),
+    ]
+    for minute, (session_id, sender, message) in enumerate(messages):
+        db.session.add(ChatMessage(user_id=user_id, session_id=session_id, Sender_type=sender,
+                                   message=message, timestamp=START + timedelta(minutes=minute)))
+    db.session.commit()
+
+
+def summaries(manager, user_id='7'):
+    return {row['id']: (row['title'], row['message_count'], row['timestamp']) for row in manager.get_chat_sessions_summary(user_id)}
+
+
+def test_sidebar_shows_sessions_written_before_the_table(manager):
+    seed_legacy_history()
+    assert ChatSession.query.count() == 0
+    assert summaries(manager) == {
+        'old-1': ('where is the library', 3, START),
+        'old-2': ('office hours', 2, START + timedelta(minutes=3)),
+    }
+    assert [row['id'] for row in manager.get_chat_sessions_page('7', limit=1)['sessions']] == ['old-2']
+
+
+def test_old_session_continued_after_the_upgrade(manager):
+    seed_legacy_history()
+    # New messages create a session row that only counts themselves
+    manager.add_chat_message('7', 'old-1', 'user', 'and the gym?')
+    manager.add_chat_message('7', 'new', 'user', 'hi')
+    assert ChatSession.query.filter_by(id='old-1').one().message_count == 1
+    assert summaries(manager) == {
+        'old-1': ('where is the library', 4, START),
+        'old-2': ('office hours', 2, START + timedelta(minutes=3)),
+        'new': ('hi', 1, ChatSession.query.filter_by(id='new').one().started_at),
+    }
+
+
+def test_backfill_is_idempotent(manager):
+    seed_legacy_history()
+    seed_legacy_history(user_id='8')
+    assert backfill_chat_sessions(db, user_id='7') == 2
+    assert backfill_chat_sessions(db) == 2
+    assert backfill_chat_sessions(db) == 0
+    assert ChatSession.query.count() == 4
@@ -0,0 +1,126 @@
+import atexit
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import ChatMessage, ChatSession
+from user_management import ChatMessageWriter, UserManager
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def row(session_id, message, user_id='7'):
+    return {'user_id': user_id, 'session_id': session_id, 'Sender_type': 'user',
+            'message': message, 'timestamp': datetime.utcnow(), 'user_role': 'user'}
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Sizes of the batches the writers write."""
+    sizes = []
+    write = ChatMessageWriter._write
+    monkeypatch.setattr(ChatMessageWriter, '_write', lambda self, rows: (sizes.append(len(rows)), write(self, rows)))
+    return sizes
+
+
+def test_rows_are_written_in_batches(app, batches):
+    writer = ChatMessageWriter(app, db, max_batch=3, flush_interval=60)
+    for i in range(7):
+        writer.add(row('s1', f'message {i}'))
+    writer.flush()
+
+    assert batches == [3, 3, 1]
+    assert [msg.message for msg in ChatMessage.query.order_by(ChatMessage.id)] == [f'message {i}' for i in range(7)]
+    assert ChatSession.query.filter_by(id='s1').one().message_count == 7
+
+
+def test_batch_is_written_after_the_flush_interval(app, batches):
+    writer = ChatMessageWriter(app, db, max_batch=100, flush_interval=0.05)
+    writer.add(row('s1', 'hello'))
+    writer.queue.join()
+    assert batches == [1]
+    assert ChatMessage.query.count() == 1
+
+
+def test_queued_messages_are_written_at_exit(app, monkeypatch):
+    exit_handlers = []
+    monkeypatch.setattr(atexit, 'register', exit_handlers.append)
+    manager = UserManager(db, app=app)
+    manager.chat_writer.flush_interval = 60
+    manager.add_chat_message('7', 's1', 'user', 'hi')
+    manager.add_chat_message('7', 's1', 'bot', 'hello')
+    db.session.remove()
+    assert ChatMessage.query.count() == 0
+
+    for handler in exit_handlers:
+        handler()
+    db.session.remove()
+    assert ChatMessage.query.count() == 2
+
+
+def test_flush_without_a_writer_thread_returns(app):
+    writer = ChatMessageWriter(app, db)
+    writer.flush()
+    assert not writer._worker.running()
+
+
+def test_full_queue_falls_back_to_a_direct_write(app, monkeypatch):
+    writer = ChatMessageWriter(app, db, max_queue=1)
+    # No writer thread drains the queue
+    monkeypatch.setattr(writer._worker, 'ensure_started', lambda: None)
+    writer.add(row('s1', 'queued'))
+    writer.add(row('s1', 'direct'))
+
+    assert writer.queue.qsize() == 1
+    assert [msg.message for msg in ChatMessage.query] == ['direct']
+
+
+def seed_history():
+    """Six sessions, two of them started at the same time, and one session with tied message timestamps."""
+    for i in range(6):
+        started = START + timedelta(hours=min(i, 4))
+        db.session.add(ChatMessage(user_id='7', session_id=f's{i}', Sender_type='user',
+                                   message=f'question {i}', timestamp=started))
+    for i in range(5):
+        db.session.add(ChatMessage(user_id='7', session_id='s0', Sender_type='bot',
+                                   message=f'answer {i}', timestamp=START + timedelta(minutes=min(i, 2))))
+    db.session.commit()
+
+
+def test_sessions_page_through_without_gaps(app):
+    seed_history()
+    manager = UserManager(db, app=app)
+    seen = []
+    cursor = None
+    while True:
+        page = manager.get_chat_sessions_page('7', limit=2, cursor=cursor)
+        seen.extend(session['id'] for session in page['sessions'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == ['s5', 's4', 's3', 's2', 's1', 's0']
+
+
+def test_session_messages_page_back_without_gaps(app):
+    seed_history()
+    manager = UserManager(db, app=app)
+    pages = []
+    cursor = None
+    while True:
+        page = manager.get_chat_session_history('7', 's0', limit=2, cursor=cursor)
+        pages.append([msg['message'] for msg in page['messages']])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert pages == [['answer 3', 'answer 4'], ['answer 1', 'answer 2'], ['question 0', 'answer 0']]
+    assert len(manager.get_chat_session_history('7', 's0')['messages']) == 6
+
+
+def test_malformed_cursor_is_rejected(app):
+    manager = UserManager(db, app=app)
+    for cursor in ('not-a-cursor', 'W10'):
+        with pytest.raises(ValueError):
+            manager.get_chat_sessions_page('7', cursor=cursor)
+        with pytest.raises(ValueError):
+            manager.get_chat_session_history('7', 's0', limit=2, cursor=cursor)
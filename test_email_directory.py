@@ -0,0 +1,98 @@
+import pytest
+
+from database import email_directory
+from database.email_directory import EmailDirectoryCache, school_aliases
+
+ENTRIES = [
+    ("SOICT Office", "soict@wvsu.edu.ph"),
+    ("Guidance Office", "guidance@wvsu.edu.ph"),
+    ("University Clinic", "clinic@wvsu.edu.ph"),
+    ("HR Office", "hr@wvsu.edu.ph"),
+    ("Registrar's Office", "registrar@wvsu.edu.ph"),
+    ("Dean, College of Nursing", "con@wvsu.edu.ph"),
+    ("Office of Student Affairs and Services", "osas@wvsu.edu.ph"),
+    ("College of ICT", "cict@wvsu.edu.ph"),
+]
+
+# Message -> schools it must find
+QUERIES = {
+    "email soict": ["SOICT Office"],
+    "email guidance": ["Guidance Office"],
+    "email clinic": ["University Clinic"],
+    "email hr": ["HR Office"],
+    "email registrar": ["Registrar's Office"],
+    "email registrar's office": ["Registrar's Office"],
+    "contact the registrar s office": ["Registrar's Office"],
+    "email nursing": ["Dean, College of Nursing"],
+    "email dean": ["Dean, College of Nursing"],
+    "email osas": ["Office of Student Affairs and Services"],
+    "student affairs email": ["Office of Student Affairs and Services"],
+    "email college of ict": ["College of ICT"],
+}
+
+
+@pytest.fixture
+def directory(app, tmp_path, monkeypatch):
+    directory = EmailDirectoryCache(stamp_path=str(tmp_path / "email_directory.stamp"), interval=0)
+    monkeypatch.setattr(email_directory, "directory", directory)
+    for school, email in ENTRIES:
+        email_directory.add_email(school, email)
+    return directory
+
+
+def old_scan(text):
+    """Entries the substring scan used before the matcher found (any token inside the school name)."""
+    tokens = text.lower().replace("'", " ").split()
+    return [school for school, _email in ENTRIES if any(token in school.lower() for token in tokens)]
+
+
+@pytest.mark.parametrize("query", sorted(QUERIES))
+def test_search_finds_named_offices(directory, query):
+    assert [entry["school"] for entry in email_directory.search_emails(query)] == QUERIES[query]
+
+
+@pytest.mark.parametrize("query", ["email soict", "email guidance", "email clinic", "email hr", "email registrar"])
+def test_search_keeps_what_the_old_scan_found(directory, query):
+    found = [entry["school"] for entry in email_directory.search_emails(query)]
+    assert set(QUERIES[query]) <= set(old_scan(query))
+    assert set(QUERIES[query]) <= set(found)
+
+
+def test_generic_words_match_nothing(directory):
+    assert email_directory.search_emails("email the office") == []
+    assert email_directory.search_emails("send it to my email") == []
+
+
+def test_aliases_drop_possessives_and_generic_words():
+    aliases = school_aliases("Registrar's Office")
+    assert "registrar" in aliases
+    assert "rso" not in aliases and "ro" not in aliases
+    assert "office" not in school_aliases("Guidance Office")
+    assert "go" not in school_aliases("Guidance Office")
+    assert "osas" in school_aliases("Office of Student Affairs and Services")
+
+
+def test_own_change_reloads_once(directory, monkeypatch):
+    loads = []
+    build = email_directory.build_snapshot
+    monkeypatch.setattr(email_directory, "build_snapshot", lambda entries: (loads.append(len(entries)), build(entries))[1])
+    directory.snapshot()
+    generation = directory.generation()
+
+    email_directory.add_email("Library", "library@wvsu.edu.ph")
+    assert directory.generation() == generation + 1
+    assert [entry["school"] for entry in email_directory.search_emails("email library")] == ["Library"]
+    directory.snapshot()
+    assert directory.generation() == generation + 1
+    assert loads == [len(ENTRIES), len(ENTRIES) + 1]
+
+
+def test_other_workers_notice_a_change(directory):
+    other = EmailDirectoryCache(stamp_path=directory.stamp_path, interval=0)
+    other.snapshot()
+    generation = other.generation()
+
+    email_directory.delete_email(email_directory.get_all_emails()[0]["id"])
+    assert other.generation() == generation + 1
+    assert len(other.snapshot().entries) == len(ENTRIES) - 1
+    assert other.generation() == generation + 1
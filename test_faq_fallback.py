@@ -0,0 +1,29 @@
+from chatbot import Chatbot, FAQ_SIMILARITY_THRESHOLD
+
+# Messages sharing a word or two with an FAQ question but asking something else
+OFF_TOPIC_QUERIES = [
+    'mission impossible movie tickets',
+    'DORAN pizza rocket banana volcano',
+    'zebra quokka office hours',
+]
+
+chatbot = Chatbot()
+
+
+def test_off_topic_queries_fall_back():
+    for role in ('guest', 'user', 'admin'):
+        for query in OFF_TOPIC_QUERIES:
+            result = chatbot.match(query, user_role=role)
+            assert result.stage == 'fallback', f'{role}: {query!r} answered by {result.stage} ({result.score})'
+
+
+def test_off_topic_queries_stay_below_threshold():
+    retriever = chatbot.snapshots['user'].faq_retriever
+    for query, (_, score) in zip(OFF_TOPIC_QUERIES, retriever.query_many(OFF_TOPIC_QUERIES)):
+        assert score < FAQ_SIMILARITY_THRESHOLD, f'{query!r} scored {score}'
+        assert retriever.query(query)[1] < FAQ_SIMILARITY_THRESHOLD
+
+
+def test_faq_questions_still_answered():
+    for faq in chatbot.faqs[:10]:
+        assert chatbot.match(faq['question'], user_role='user').stage in ('faq', 'question', 'keyword')
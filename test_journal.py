@@ -0,0 +1,116 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+from database import journal
+from database.journal import JournaledDocument
+from database.persistence import write_json_atomic
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "rules.json")
+    write_json_atomic(path, {"SOICT": [{"id": "1", "question": "q1", "answer": "a1"}]})
+    return path
+
+
+def journal_lines(path):
+    with open(journal.journal_path(path)) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_replay_rebuilds_the_document(path):
+    document = JournaledDocument(path, default={})
+    document.apply({"op": "append", "path": ["SOICT"], "value": {"id": "2", "question": "q2"}})
+    document.apply({"op": "update_id", "path": ["SOICT"], "id": "1", "value": {"answer": "b1"}})
+    document.apply({"op": "delete_id", "path": ["SOICT"], "id": "2"})
+    document.apply({"op": "append", "path": ["CAS"], "value": {"id": "3", "question": "q3"}})
+
+    # The base file is untouched; a fresh reader replays the journal on top of it
+    with open(path) as f:
+        assert json.load(f) == {"SOICT": [{"id": "1", "question": "q1", "answer": "a1"}]}
+    assert JournaledDocument(path, default={}).snapshot() == document.snapshot() == {
+        "SOICT": [{"id": "1", "question": "q1", "answer": "b1"}],
+        "CAS": [{"id": "3", "question": "q3"}],
+    }
+
+
+def test_other_readers_tail_new_entries(path):
+    writer = JournaledDocument(path, default={})
+    reader = JournaledDocument(path, default={})
+    assert reader.snapshot() == writer.snapshot()
+    version = reader.version
+    writer.apply({"op": "append", "path": ["SOICT"], "value": {"id": "2"}})
+    assert reader.refresh()
+    assert reader.version > version
+    assert reader.snapshot() == writer.snapshot()
+
+
+def test_rejected_op_is_not_journaled(path):
+    document = JournaledDocument(path, default={})
+    with pytest.raises(KeyError):
+        document.apply({"op": "delete_id", "path": ["SOICT"], "id": "missing"})
+    assert not os.path.exists(journal.journal_path(path))
+
+
+def test_journal_of_another_base_is_ignored(path):
+    document = JournaledDocument(path, default={})
+    document.apply({"op": "append", "path": ["SOICT"], "value": {"id": "2"}})
+    # A crash after compaction rewrote the base file but before the journal was reset
+    write_json_atomic(path, {"SOICT": [{"id": "1"}, {"id": "2"}]})
+    assert JournaledDocument(path, default={}).snapshot() == {"SOICT": [{"id": "1"}, {"id": "2"}]}
+
+
+def test_compaction_at_threshold(path):
+    document = JournaledDocument(path, default={}, compact_threshold=3)
+    for i in range(2, 5):
+        document.apply({"op": "append", "path": ["SOICT"], "value": {"id": str(i)}})
+    with open(path) as f:
+        assert [rule["id"] for rule in json.load(f)["SOICT"]] == ["1", "2", "3", "4"]
+    # Only the header of a fresh journal is left
+    assert [list(entry) for entry in journal_lines(path)] == [["base"]]
+    document.apply({"op": "append", "path": ["SOICT"], "value": {"id": "5"}})
+    assert len(journal_lines(path)) == 2
+    assert [rule["id"] for rule in JournaledDocument(path, default={}).snapshot()["SOICT"]] == ["1", "2", "3", "4", "5"]
+
+
+def test_no_compaction_below_threshold(path):
+    with open(path, "rb") as f:
+        base = f.read()
+    document = JournaledDocument(path, default={})
+    document.apply({"op": "append", "path": ["SOICT"], "value": {"id": "2"}})
+    document.refresh()
+    with open(path, "rb") as f:
+        assert f.read() == base
+
+
+def append_rules(path, prefix, count):
+    document = JournaledDocument(path, default={}, compact_threshold=7)
+    for i in range(count):
+        document.apply({"op": "append", "path": ["SOICT"], "value": {"id": f"{prefix}{i}"}})
+
+
+@pytest.mark.skipif(journal.fcntl is None, reason="needs flock")
+def test_two_processes_appending(path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=append_rules, args=(path, prefix, 25)) for prefix in ("a", "b")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    ids = [rule["id"] for rule in JournaledDocument(path, default={}).snapshot()["SOICT"]]
+    assert sorted(ids) == sorted(["1"] + [f"{prefix}{i}" for prefix in ("a", "b") for i in range(25)])
+    # Each process kept its own order
+    for prefix in ("a", "b"):
+        assert [i for i in ids if i.startswith(prefix)] == [f"{prefix}{i}" for i in range(25)]
+
+
+def test_journal_takes_the_mode_of_its_data_file(path):
+    os.chmod(path, 0o640)
+    document = JournaledDocument(path, default={}, compact_threshold=1)
+    document.apply({"op": "append", "path": ["SOICT"], "value": {"id": "2"}})
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.stat(journal.journal_path(path)).st_mode & 0o777 == 0o640
@@ -0,0 +1,25 @@
+import os
+import stat
+
+from database.persistence import read_json, write_json_atomic
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_write_json_atomic_keeps_the_file_mode(tmp_path):
+    path = tmp_path / "faqs.json"
+    path.write_text("[]")
+    os.chmod(path, 0o644)
+    write_json_atomic(str(path), [{"question": "q"}])
+    assert mode(path) == 0o644
+    assert read_json(str(path)) == [{"question": "q"}]
+
+
+def test_write_json_atomic_creates_files_like_open(tmp_path):
+    write_json_atomic(str(tmp_path / "new.json"), {})
+    with open(tmp_path / "plain.json", "w"):
+        pass
+    assert mode(tmp_path / "new.json") == mode(tmp_path / "plain.json")
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")]
@@ -0,0 +1,93 @@
+import pytest
+
+from database import journal
+from database.journal import JournaledDocument
+from database.persistence import write_json_atomic
+from database.user_database.rule_utils import RuleStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    path = str(tmp_path / "rules.json")
+    write_json_atomic(path, {
+        "SOICT": [{"id": str(i), "question": f"q{i}", "answer": f"a{i}"} for i in range(5)],
+        "CAS": [{"id": "c1", "question": "qc", "answer": "ac"}],
+    })
+    store = RuleStore(path)
+    rebuilds = []
+    reindex = store._reindex
+    monkeypatch.setattr(store, "_reindex", lambda data: (rebuilds.append(1), reindex(data)))
+    store.rebuilds = rebuilds
+    return store
+
+
+def fresh_index(store):
+    by_id, positions = {}, {}
+    for category, rules in store.snapshot().items():
+        for i, rule in enumerate(rules):
+            by_id[rule["id"]] = category
+            positions[rule["id"]] = i
+    return by_id, positions
+
+
+def test_own_writes_patch_the_index(store):
+    store.categories()
+    assert len(store.rebuilds) == 1
+
+    assert store.add_rule("CAS", {"id": "c2", "question": "qc2", "answer": "ac2"})
+    assert store.edit_rule("3", "new q3", "new a3")
+    assert store.delete_rule("1")
+    assert store.add_category("CBA")
+    assert store.add_rule("CBA", {"id": "b1", "question": "qb", "answer": "ab"})
+    assert store.remove_category("CAS")
+    assert store.find_category("4") == "SOICT"
+
+    assert len(store.rebuilds) == 1
+    assert (store._by_id, store._positions) == fresh_index(store)
+    assert store.snapshot()["SOICT"][2] == {"id": "3", "question": "new q3", "answer": "new a3"}
+
+
+def test_lookups_use_the_position_index(store, monkeypatch):
+    store.categories()
+    scanned = []
+    find_by_id = journal._find_by_id
+
+    def counting_find(records, record_id, locate=None):
+        i = find_by_id(records, record_id, locate)
+        scanned.append(locate is None or locate(records, record_id) != i)
+        return i
+    monkeypatch.setattr(journal, "_find_by_id", counting_find)
+
+    assert store.delete_rule("0")
+    assert store.edit_rule("4", "q", "a")
+    assert scanned == [False, False]
+
+
+def test_other_process_changes_trigger_a_rebuild(store):
+    store.categories()
+    other = JournaledDocument(store.file_path, default={})
+    other.apply({"op": "delete_id", "path": ["SOICT"], "id": "0"})
+
+    assert store.edit_rule("2", "q", "a")
+    assert store.delete_rule("3")
+    assert store.find_category("0") is None
+    assert (store._by_id, store._positions) == fresh_index(store)
+    assert store.snapshot()["SOICT"] == [
+        {"id": "1", "question": "q1", "answer": "a1"},
+        {"id": "2", "question": "q", "answer": "a"},
+        {"id": "4", "question": "q4", "answer": "a4"},
+    ]
+
+
+def test_stale_position_falls_back_to_a_scan(store):
+    store.categories()
+    store._positions["4"] = 0
+    assert store.delete_rule("4")
+    assert [rule["id"] for rule in store.snapshot()["SOICT"]] == ["0", "1", "2", "3"]
+
+
+def test_rejected_change_keeps_the_index(store):
+    store.categories()
+    assert not store.delete_rule("missing")
+    assert not store.add_category("SOICT")
+    assert (store._by_id, store._positions) == fresh_index(store)
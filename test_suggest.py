@@ -0,0 +1,63 @@
+from chatbot import Chatbot
+from rule_index import PrefixIndex
+
+QUESTIONS = [
+    'Where is the library?',
+    'Where is the SOICT office?',
+    'What are the library hours?',
+    'How do I enroll?',
+    'where is the library',  # same text as the first once normalized
+]
+
+chatbot = Chatbot()
+
+
+def test_question_starts_rank_before_word_matches():
+    index = PrefixIndex(QUESTIONS)
+    assert len(index) == 4
+    assert index.complete('where is') == ['Where is the library?', 'Where is the SOICT office?']
+    # "lib" starts no question, only words inside them
+    assert index.complete('lib') == ['Where is the library?', 'What are the library hours?']
+    assert index.complete('WHAT are the LIB') == ['What are the library hours?']
+
+
+def test_limit():
+    index = PrefixIndex(QUESTIONS)
+    assert index.complete('wh', limit=2) == ['What are the library hours?', 'Where is the library?']
+    assert index.complete('wh', limit=0) == []
+    assert len(index.complete('the', limit=20)) == 3
+
+
+def test_empty_or_blank_prefix_has_no_suggestions():
+    index = PrefixIndex(QUESTIONS)
+    for prefix in ('', '   ', '?!', 'zz'):
+        assert index.complete(prefix) == []
+
+
+def test_suggestions_follow_the_role():
+    guest_questions = {rule['question'] for rule in chatbot.guest_rules}
+    user_only = next(rule['question'] for rule in chatbot.rules if rule['question'] not in guest_questions)
+    assert user_only in chatbot.suggest(user_only, user_role='user')
+    assert user_only in chatbot.suggest(user_only, user_role='admin')
+    assert user_only not in chatbot.suggest(user_only, user_role='guest')
+    assert len(chatbot.suggest('wh', user_role='guest', limit=3)) == 3
+
+
+def test_index_is_rebuilt_only_when_suggestions_change():
+    snapshots = chatbot.snapshots
+    location_rules = chatbot.location_rules
+    try:
+        # Refitting the FAQs without changing their questions keeps the index
+        chatbot.compile_snapshots(questions=False, keywords=False)
+        assert chatbot.snapshots['user'].suggest_index is snapshots['user'].suggest_index
+        assert chatbot.snapshots['guest'].suggest_index is snapshots['guest'].suggest_index
+
+        # A new location keyword is a new suggestion
+        chatbot.location_rules = location_rules + [{'id': 'test', 'keywords': [['zeppelin', 'hangar']],
+                                                    'response': 'Behind the gym.', 'category': 'locations'}]
+        chatbot.compile_snapshots(questions=False, faqs=False)
+        assert chatbot.snapshots['user'].suggest_index is not snapshots['user'].suggest_index
+        assert chatbot.suggest('zeppelin', user_role='guest') == ['Where is zeppelin hangar?']
+    finally:
+        chatbot.location_rules = location_rules
+        chatbot.snapshots = snapshots
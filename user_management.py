@@ -1,20 +1,295 @@
+import atexit
+import base64
+import json
 import logging
+import queue
+import time
 from datetime import datetime
 from werkzeug.security import generate_password_hash
 from flask_login import UserMixin
 import uuid
 from models import User as UserModel, Admin as AdminModel
 from extensions import db
+from metrics import registry as metrics_registry
+from worker_thread import WorkerThread
+
+# Default and maximum page sizes of the paginated chat history APIs
+DEFAULT_SESSIONS_PAGE = 20
+DEFAULT_MESSAGES_PAGE = 50
+MAX_PAGE_SIZE = 100
+
+# Latency of chat message writes, exported on /metrics
+ADD_CHAT_MESSAGE_SECONDS = metrics_registry.histogram(
+    'doran_add_chat_message_seconds',
+    'Time UserManager.add_chat_message takes to return, by write mode (queued or direct).', ['mode'])
+CHAT_BATCH_SECONDS = metrics_registry.histogram(
+    'doran_chat_message_batch_seconds',
+    'Time the background writer takes to insert and commit one batch of chat messages.')
+CHAT_BATCH_SIZE = metrics_registry.histogram(
+    'doran_chat_message_batch_size',
+    'Chat messages per background writer batch.', buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+
+def encode_cursor(timestamp, key):
+    """
+    Encode the position of the last item of a page as an opaque cursor.
+
+    Args:
+        timestamp (datetime): Sort timestamp of the item.
+        key: Tie breaker for items with the same timestamp (message id or session id).
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    raw = json.dumps([timestamp.isoformat(), key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by encode_cursor.
+
+    Returns:
+        tuple: (timestamp, key).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, key = json.loads(raw.decode('utf-8'))
+        return datetime.fromisoformat(timestamp), key
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def message_columns(row):
+    """The ChatMessage columns of a queued chat message row (which also carries the session's user_role)."""
+    return {key: value for key, value in row.items() if key != 'user_role'}
+
+def record_chat_sessions(db, rows):
+    """
+    Fold newly written chat message rows into their chat_sessions rows.
+
+    Runs in the caller's transaction, before it commits the messages, so a
+    session row always agrees with its messages. Each session costs one
+    UPDATE (or an INSERT for a new session) whatever its length; counts and
+    times are updated in SQL so concurrent workers do not overwrite each other.
+
+    Args:
+        db: Flask-SQLAlchemy database.
+        rows (list): Dicts of ChatMessage columns plus user_role, in the order they were sent.
+    """
+    from models import ChatSession
+    from sqlalchemy import case, func
+    from sqlalchemy.exc import IntegrityError
+    sessions = {}
+    for row in rows:
+        key = (row['user_id'], row['session_id'])
+        summary = sessions.get(key)
+        if summary is None:
+            summary = sessions[key] = {
+                'title': None,
+                'started_at': row['timestamp'],
+                'last_message_at': row['timestamp'],
+                'message_count': 0,
+                'user_role': row.get('user_role', 'user')
+            }
+        if summary['title'] is None and row['Sender_type'] == 'user':
+            summary['title'] = row['message']
+        summary['started_at'] = min(summary['started_at'], row['timestamp'])
+        summary['last_message_at'] = max(summary['last_message_at'], row['timestamp'])
+        summary['message_count'] += 1
+
+    table = ChatSession.__table__
+    for (user_id, session_id), summary in sessions.items():
+        update = table.update().where(table.c.user_id == user_id, table.c.id == session_id).values(
+            title=func.coalesce(table.c.title, summary['title']),
+            started_at=case((table.c.started_at > summary['started_at'], summary['started_at']), else_=table.c.started_at),
+            last_message_at=case((table.c.last_message_at < summary['last_message_at'], summary['last_message_at']), else_=table.c.last_message_at),
+            message_count=table.c.message_count + summary['message_count']
+        )
+        if db.session.execute(update).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert(), [dict(summary, user_id=user_id, id=session_id)])
+        except IntegrityError:
+            # Another worker created the session in the meantime
+            db.session.execute(update)
+
+def backfill_chat_sessions(db, user_id=None, batch_size=500):
+    """
+    Create or repair the chat_sessions rows of messages written before the table existed.
+
+    Each session is recomputed from its messages (titled by its first user
+    message) and written only when its row is missing or counts fewer
+    messages than the session has, e.g. an old session continued after the
+    upgrade. Rows are never moved backwards, so messages recorded concurrently
+    by record_chat_sessions are not undone. Commits every batch_size sessions.
+
+    Args:
+        db: Flask-SQLAlchemy database.
+        user_id (str): Only backfill this user's sessions (all users when None).
+
+    Returns:
+        int: Number of sessions created or repaired.
+    """
+    from models import ChatMessage, ChatSession
+    from sqlalchemy import case, func, or_
+    from sqlalchemy.exc import IntegrityError
+    from sqlalchemy.orm import aliased
+    criteria = [ChatMessage.user_id == str(user_id)] if user_id is not None else []
+
+    # First user message of each session (ids grow with insertion order), used as the title
+    first_user_message = db.session.query(
+        ChatMessage.user_id.label('user_id'),
+        ChatMessage.session_id.label('session_id'),
+        func.min(ChatMessage.id).label('message_id')
+    ).filter(ChatMessage.Sender_type == 'user', *criteria).group_by(ChatMessage.user_id, ChatMessage.session_id).subquery()
+    title_message = aliased(ChatMessage)
+    sessions = db.session.query(
+        ChatMessage.user_id.label('user_id'),
+        ChatMessage.session_id.label('session_id'),
+        func.min(ChatMessage.timestamp).label('started_at'),
+        func.max(ChatMessage.timestamp).label('last_message_at'),
+        func.count(ChatMessage.id).label('message_count')
+    ).filter(*criteria).group_by(ChatMessage.user_id, ChatMessage.session_id).subquery()
+
+    rows = db.session.query(
+        sessions.c.user_id, sessions.c.session_id, sessions.c.started_at, sessions.c.last_message_at,
+        sessions.c.message_count, title_message.message
+    ).outerjoin(
+        first_user_message,
+        (first_user_message.c.user_id == sessions.c.user_id) & (first_user_message.c.session_id == sessions.c.session_id)
+    ).outerjoin(
+        title_message, title_message.id == first_user_message.c.message_id
+    ).outerjoin(
+        ChatSession, (ChatSession.user_id == sessions.c.user_id) & (ChatSession.id == sessions.c.session_id)
+    ).filter(or_(ChatSession.id.is_(None), ChatSession.message_count < sessions.c.message_count)).all()
+
+    table = ChatSession.__table__
+    for count, (row_user_id, session_id, started_at, last_message_at, message_count, title) in enumerate(rows, 1):
+        summary = {'title': title, 'started_at': started_at, 'last_message_at': last_message_at, 'message_count': message_count}
+        update = table.update().where(
+            table.c.user_id == row_user_id, table.c.id == session_id, table.c.message_count < message_count
+        ).values(
+            # The row only saw later messages: the earlier ones give the session its start and title
+            title=func.coalesce(title, table.c.title),
+            started_at=case((table.c.started_at > started_at, started_at), else_=table.c.started_at),
+            last_message_at=case((table.c.last_message_at < last_message_at, last_message_at), else_=table.c.last_message_at),
+            message_count=message_count
+        )
+        if not db.session.execute(update).rowcount:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert(), [dict(summary, user_id=row_user_id, id=session_id)])
+            except IntegrityError:
+                # Created by a new message in the meantime
+                db.session.execute(update)
+        if count % batch_size == 0:
+            db.session.commit()
+    db.session.commit()
+    return len(rows)
+
+class ChatMessageWriter:
+    """
+    Background writer that persists chat messages in batched inserts.
+
+    add() only puts the row on a bounded queue, so a chat reply no longer
+    waits for database commits. A daemon thread writes the queued rows in one
+    multi-row INSERT + commit when max_batch rows are waiting or flush_interval
+    seconds after the first one arrived, whichever comes first. flush() writes
+    everything queued so far and waits for it; it runs before history reads
+    and deletes, and at interpreter exit.
+    """
+
+    _FLUSH = object()
+
+    def __init__(self, app, db, max_batch=100, flush_interval=0.5, max_queue=10000):
+        self.app = app
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._worker = WorkerThread(self._run, "chat-message-writer")
+        atexit.register(self.flush)
+
+    def add(self, row):
+        """
+        Queue a row (a dict of ChatMessage columns plus user_role) to be written.
+        When the queue stays full for a second the row is written synchronously instead.
+        """
+        self._worker.ensure_started()
+        try:
+            self.queue.put(row, timeout=1.0)
+        except queue.Full:
+            logging.warning("Chat message queue is full, writing synchronously")
+            self._write([row])
+
+    def flush(self):
+        """Write every queued row now and wait until it is committed."""
+        if not self._worker.running():
+            # No writer thread in this process: nothing can be queued
+            return
+        self.queue.put(self._FLUSH)
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            batch = []
+            done = 1
+            deadline = time.monotonic() + self.flush_interval
+            # Collect rows until the batch is full, the interval elapsed or a flush was requested
+            while item is not self._FLUSH:
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                done += 1
+            try:
+                if batch:
+                    self._write(batch)
+            finally:
+                for _ in range(done):
+                    self.queue.task_done()
+
+    def _write(self, rows):
+        from models import ChatMessage
+        start = time.perf_counter()
+        with self.app.app_context():
+            try:
+                self.db.session.execute(ChatMessage.__table__.insert(), [message_columns(row) for row in rows])
+                record_chat_sessions(self.db, rows)
+                self.db.session.commit()
+                CHAT_BATCH_SECONDS.observe(time.perf_counter() - start)
+                CHAT_BATCH_SIZE.observe(len(rows))
+            except Exception as e:
+                self.db.session.rollback()
+                logging.error(f"Failed to write {len(rows)} chat messages: {e}")
+
 
 class UserManager:
     """
     UserManager class to handle user and admin management and chat history.
     """
-    def __init__(self, db):
+    def __init__(self, db, app=None):
         """
         Initialize UserManager with database connection and create default admin.
+
+        Args:
+            db: Flask-SQLAlchemy database.
+            app: Flask app. When given, chat messages are written in the background
+                in batches (see ChatMessageWriter); otherwise each one is committed immediately.
         """
         self.db = db
+        self.chat_writer = ChatMessageWriter(app, db) if app is not None else None
+        # Users whose older sessions were already backfilled by this process
+        self._backfilled_users = set()
         admin_email = "admin@wvsu.edu.ph"
         admin = self.get_admin_by_email(admin_email)
         if not admin:
@@ -112,26 +387,44 @@ class UserManager:
         """
         return UserModel.query.filter_by(username=username).first()
 
-    def add_chat_message(self, user_id, session_id, sender_type, message):
+    def add_chat_message(self, user_id, session_id, sender_type, message, user_role='user'):
         """
         Add a message to a user's chat history.
+        With the background writer enabled the message is queued and committed in the next batch.
 
         Args:
             user_id (int): User ID.
             session_id (str): Chat session ID.
             sender_type (str): 'user' or 'bot'.
             message (str): Message content.
+            user_role (str): Role of the account ('user' or 'admin'), which decides how long the session is kept.
         """
         from models import ChatMessage
-        chat_message = ChatMessage(
-            user_id=str(user_id),  # Convert to string for MySQL varchar
-            session_id=session_id,
-            Sender_type=sender_type,  # Capital S
-            message=message,
-            timestamp=datetime.utcnow()
-        )
-        self.db.session.add(chat_message)
+        start = time.perf_counter()
+        row = {
+            'user_id': str(user_id),  # Convert to string for MySQL varchar
+            'session_id': session_id,
+            'Sender_type': sender_type,  # Capital S
+            'message': message,
+            # Taken now, not when the batch is written, so message order is preserved
+            'timestamp': datetime.utcnow(),
+            'user_role': user_role
+        }
+        if self.chat_writer is not None:
+            self.chat_writer.add(row)
+            ADD_CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - start, 'queued')
+            return
+        self.db.session.add(ChatMessage(**message_columns(row)))
+        record_chat_sessions(self.db, [row])
         self.db.session.commit()
+        ADD_CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - start, 'direct')
+
+    def flush_chat_messages(self):
+        """
+        Write chat messages still queued by the background writer, so reads and deletes see them.
+        """
+        if self.chat_writer is not None:
+            self.chat_writer.flush()
 
     def get_chat_history(self, user_id):
         """
@@ -143,6 +436,7 @@ class UserManager:
         Returns:
             dict: Sessions with title and messages.
         """
+        self.flush_chat_messages()
         from models import ChatMessage
         messages = ChatMessage.query.filter_by(user_id=str(user_id)).order_by(ChatMessage.timestamp.asc()).all()
 
@@ -166,52 +460,163 @@ class UserManager:
         sorted_sessions = dict(sorted(sessions.items(), key=lambda x: x[1]['timestamp'], reverse=True))
         return sorted_sessions
 
-    def get_chat_sessions_summary(self, user_id):
+    def get_chat_history_page(self, user_id, limit=DEFAULT_SESSIONS_PAGE, cursor=None):
+        """
+        Get one page of a user's chat history: the next sessions (newest first) with their messages.
+
+        Args:
+            user_id (int): User ID.
+            limit (int): Number of sessions per page.
+            cursor (str): next_cursor of the previous page, None for the first page.
+
+        Returns:
+            dict: 'sessions' (same shape as get_chat_history) and 'next_cursor' (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is malformed.
         """
-        Get a summary of chat sessions for the user.
+        page = self.get_chat_sessions_page(user_id, limit=limit, cursor=cursor)
+        sessions = {
+            summary['id']: {'title': summary['title'], 'messages': [], 'timestamp': summary['timestamp']}
+            for summary in page['sessions']
+        }
+        if sessions:
+            from models import ChatMessage
+            messages = ChatMessage.query.filter(
+                ChatMessage.user_id == str(user_id), ChatMessage.session_id.in_(list(sessions))
+            ).order_by(ChatMessage.timestamp.asc(), ChatMessage.id.asc()).all()
+            for msg in messages:
+                sessions[msg.session_id]['messages'].append({
+                    'sender': msg.Sender_type,
+                    'message': msg.message,
+                    'timestamp': msg.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+                })
+        return {'sessions': sessions, 'next_cursor': page['next_cursor']}
+
+    def get_chat_sessions_summary(self, user_id, limit=None, before=None):
+        """
+        Get a summary of chat sessions for the user, newest first.
+        Reads one chat_sessions row per session; messages are not scanned.
 
         Args:
             user_id (int): User ID.
+            limit (int): Maximum number of sessions to return (all when None).
+            before (tuple): (started, session_id) of the last session already seen;
+                only older sessions are returned.
 
         Returns:
             list: List of session summaries.
         """
-        from models import ChatMessage
-        messages = ChatMessage.query.filter_by(user_id=str(user_id)).order_by(ChatMessage.timestamp.asc()).all()
+        self.flush_chat_messages()
+        self.backfill_chat_sessions(user_id)
+        from models import ChatSession
+        from sqlalchemy import and_, or_
+        query = ChatSession.query.filter_by(user_id=str(user_id))
+        if before is not None:
+            before_timestamp, before_session = before
+            query = query.filter(or_(
+                ChatSession.started_at < before_timestamp,
+                and_(ChatSession.started_at == before_timestamp, ChatSession.id < before_session)
+            ))
+        # Ordered by (start, session id) so pages never overlap or skip
+        query = query.order_by(ChatSession.started_at.desc(), ChatSession.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [
+            {
+                'id': chat_session.id,
+                'title': chat_session.title,
+                'timestamp': chat_session.started_at,
+                'last_message_at': chat_session.last_message_at,
+                'message_count': chat_session.message_count
+            }
+            for chat_session in query.all()
+        ]
+
+    def backfill_chat_sessions(self, user_id):
+        """
+        Build the user's chat_sessions rows for history written before the table existed,
+        once per process, so their older sessions keep showing in the sidebar.
+        """
+        user_id = str(user_id)
+        if user_id in self._backfilled_users:
+            return
+        created = backfill_chat_sessions(self.db, user_id)
+        if created:
+            logging.info(f"Backfilled {created} chat sessions of user {user_id}")
+        self._backfilled_users.add(user_id)
+
+    def get_chat_sessions_page(self, user_id, limit=DEFAULT_SESSIONS_PAGE, cursor=None):
+        """
+        Get one page of the user's chat sessions, newest first.
 
-        sessions = {}
-        for msg in messages:
-            session_id = msg.session_id
-            if session_id not in sessions:
-                sessions[session_id] = {
-                    'id': session_id,
-                    'title': None,
-                    'timestamp': msg.timestamp
-                }
-            if sessions[session_id]['title'] is None and msg.Sender_type == 'user':
-                sessions[session_id]['title'] = msg.message
-        # Sort by timestamp descending
-        sorted_sessions = sorted(sessions.values(), key=lambda x: x['timestamp'], reverse=True)
-        return sorted_sessions
+        Args:
+            user_id (int): User ID.
+            limit (int): Page size.
+            cursor (str): next_cursor of the previous page, None for the first page.
+
+        Returns:
+            dict: 'sessions' (session summaries) and 'next_cursor' (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        before = decode_cursor(cursor) if cursor else None
+        # One extra row tells whether another page follows
+        sessions = self.get_chat_sessions_summary(user_id, limit=limit + 1, before=before)
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            next_cursor = encode_cursor(sessions[-1]['timestamp'], sessions[-1]['id'])
+        return {'sessions': sessions, 'next_cursor': next_cursor}
 
-    def get_chat_session_history(self, user_id, session_id):
+    def get_chat_session_history(self, user_id, session_id, limit=None, cursor=None):
         """
-        Get the full chat history for a specific session.
+        Get the chat history for a specific session, oldest message first.
+
+        With a limit only the newest messages before the cursor are returned;
+        pass next_cursor back to load the messages before those.
 
         Args:
             user_id (int): User ID.
             session_id (str): Session ID.
+            limit (int): Maximum number of messages to return (all when None).
+            cursor (str): next_cursor of the previous page, None for the newest messages.
 
         Returns:
-            dict: Session data with messages.
+            dict: Session data with messages and 'next_cursor' (None when there are no older messages).
+
+        Raises:
+            ValueError: If the cursor is malformed.
         """
+        self.flush_chat_messages()
         from models import ChatMessage
-        messages = ChatMessage.query.filter_by(user_id=str(user_id), session_id=session_id).order_by(ChatMessage.timestamp.asc()).all()
+        from sqlalchemy import and_, or_
+        query = ChatMessage.query.filter_by(user_id=str(user_id), session_id=session_id)
+        if cursor:
+            before_timestamp, before_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                ChatMessage.timestamp < before_timestamp,
+                and_(ChatMessage.timestamp == before_timestamp, ChatMessage.id < before_id)
+            ))
+        # Keyset order: (timestamp, id) is unique, so pages never overlap or skip messages
+        query = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc())
+        if limit is not None:
+            # One extra row tells whether older messages remain
+            query = query.limit(limit + 1)
+        messages = query.all()
+
+        next_cursor = None
+        if limit is not None and len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
 
         session_data = {
-            'messages': []
+            'messages': [],
+            'next_cursor': next_cursor
         }
-        for msg in messages:
+        for msg in reversed(messages):
             session_data['messages'].append({
                 'sender': msg.Sender_type,
                 'message': msg.message,
@@ -226,9 +631,13 @@ class UserManager:
         Args:
             user_id (int): User ID.
         """
-        from models import ChatMessage
-        ChatMessage.query.filter_by(user_id=str(user_id)).delete()
+        self.flush_chat_messages()
+        from models import ChatMessage, ChatSession
+        from chat_retention import delete_chat_messages
+        # Sessions first, so the sidebar never lists a half-deleted session
+        ChatSession.query.filter_by(user_id=str(user_id)).delete()
         self.db.session.commit()
+        delete_chat_messages(self.db, ChatMessage.user_id == str(user_id))
 
     def get_pending_users(self):
         """
@@ -275,20 +684,25 @@ class UserManager:
 
     def delete_chat_session(self, user_id, session_id):
         """
-        Delete all chat messages for a specific user and session.
+        Delete a chat session (its chat_sessions row and all its messages).
 
         Args:
             user_id (int): User ID.
             session_id (str): Chat session ID.
 
         Returns:
-            bool: True if deletion was successful, False otherwise.
+            bool: True if the session was deleted, False if it does not exist or could not be deleted.
         """
-        from models import ChatMessage
+        self.flush_chat_messages()
+        from models import ChatMessage, ChatSession
+        from chat_retention import delete_chat_messages
         try:
-            ChatMessage.query.filter_by(user_id=str(user_id), session_id=session_id).delete()
+            deleted = ChatSession.query.filter_by(user_id=str(user_id), id=session_id).delete()
             self.db.session.commit()
-            return True
+            # Messages of sessions that predate chat_sessions (not backfilled yet) are still removed
+            deleted += delete_chat_messages(
+                self.db, ChatMessage.user_id == str(user_id), ChatMessage.session_id == session_id)
+            return deleted > 0
         except Exception as e:
             self.db.session.rollback()
             return False
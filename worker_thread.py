@@ -0,0 +1,32 @@
+import os
+import threading
+
+
+class WorkerThread:
+    """
+    A daemon thread that is started on first use, and again after a fork.
+
+    Threads do not survive fork(), so starting lazily lets each gunicorn worker
+    run its own copy of the thread instead of relying on one started in the master.
+    """
+
+    def __init__(self, target, name):
+        self.target = target
+        self.name = name
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def running(self):
+        """Return True if the thread runs in this process."""
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def ensure_started(self):
+        """Start the thread in this process unless it is already running."""
+        if self.running():
+            return
+        with self._lock:
+            if not self.running():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+                self._thread.start()